@@ -1,7 +1,10 @@
 from fastapi import APIRouter
-from .endpoints import chat, questions, config,productfinder
+from .endpoints import chat, questions, config,productfinder, bootstrap, orders, webhooks
 api_router=APIRouter()
 api_router.include_router(chat.router,tags=['chat'])
 api_router.include_router(questions.router,tags=['questions'])
 api_router.include_router(config.router,tags=['config'])
-api_router.include_router(productfinder.router,tags=['productfinder'])
\ No newline at end of file
+api_router.include_router(productfinder.router,tags=['productfinder'])
+api_router.include_router(bootstrap.router,tags=['bootstrap'])
+api_router.include_router(orders.router,tags=['orders'])
+api_router.include_router(webhooks.router,tags=['webhooks'])
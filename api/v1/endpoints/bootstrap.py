@@ -0,0 +1,83 @@
+import asyncio
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from services.auth import verify_api_key, check_rate_limit
+from services.catalog_cache import get_category_questions, get_product_category_id
+from api.v1.endpoints.config import build_widget_config
+from api.v1.endpoints.productdetails import get_product_context
+
+router = APIRouter()
+
+
+def _numeric_product_id(product_id: Optional[str]) -> Optional[int]:
+    # Widget may send a plain id or a gid://shopify/Product/<id>
+    match = re.search(r"(\d+)$", str(product_id or ""))
+    return int(match.group(1)) if match else None
+
+
+def _load_questions(product_id: Optional[int], limit: int) -> list:
+    if product_id is None:
+        return []
+    # Also warms the product → category map /chat uses for FAQ matches
+    category_id = get_product_category_id(product_id)
+    if not category_id:
+        return []
+    return get_category_questions(category_id)[:limit]
+
+
+async def _load_product_context(product_id: Optional[int]) -> Optional[dict]:
+    if product_id is None:
+        return None
+    return await get_product_context(str(product_id))
+
+
+@router.get('/bootstrap')
+async def bootstrap_widget(
+    x_api_key: str = Header(..., alias='X-API-KEY'),
+    product_id: Optional[str] = Query(None),
+    questions_limit: int = Query(6, ge=1, le=50),
+):
+    """
+    Everything the widget needs on a product page in one round trip:
+    config, suggested questions and the product context /chat will use
+    (left warm in its cache). Parts resolve concurrently — questions are
+    looked up again once the context fetch has saved a product seen for
+    the first time. A failing product or questions lookup degrades to
+    null/[] instead of failing.
+    """
+    try:
+        config = verify_api_key(x_api_key)
+        check_rate_limit(x_api_key, config['rate_limit'])
+        numeric_id = _numeric_product_id(product_id)
+        questions, product_context = await asyncio.gather(
+            asyncio.to_thread(_load_questions, numeric_id, questions_limit),
+            _load_product_context(numeric_id),
+            return_exceptions=True,
+        )
+        if isinstance(questions, Exception):
+            print(f"⚠️ Bootstrap questions failed: {questions}")
+            questions = []
+        if isinstance(product_context, Exception):
+            print(f"⚠️ Bootstrap product context failed: {product_context}")
+            product_context = None
+        if not questions and product_context is not None:
+            # First visit: the product (and its category) was only saved by
+            # the context fetch, after the concurrent lookup had missed it
+            try:
+                questions = await asyncio.to_thread(_load_questions, numeric_id, questions_limit)
+            except Exception as e:
+                print(f"⚠️ Bootstrap questions failed: {e}")
+                questions = []
+        return {
+            "config": build_widget_config(config),
+            "questions": questions,
+            "product_context": product_context,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error bootstrapping widget: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
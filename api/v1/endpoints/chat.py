@@ -1,6 +1,10 @@
 from fastapi import APIRouter, Header, HTTPException
+import re
+from bson import ObjectId
 from models.schemas import ChatRequest, ChatResponse, ShopifyProduct, product_questions
 from services.auth import verify_api_key, check_rate_limit
+from services.catalog_cache import get_product_category_id
+from services.question_popularity import record_question_hit
 from services.chatbot_service import ChatbotService
 from api.v1.endpoints.productdetails import get_product_details
 router = APIRouter()
@@ -151,17 +155,20 @@ async def chat_endpoint(request: ChatRequest, x_api_key: str = Header(..., alias
         response_text = None
         if shopify_product_id:
             try:
-                product_obj = ShopifyProduct.objects.get(_id=shopify_product_id)
-                category_obj = product_obj.category_id
-                if category_obj:
+                id_match = re.search(r"(\d+)$", str(shopify_product_id))
+                category_id = get_product_category_id(int(id_match.group(1))) if id_match else None
+                if category_id is None:
+                    raise ShopifyProduct.DoesNotExist
+                if category_id:
                     print(f"🔍 Checking DB for exact match...")
                     matching_question = product_questions.objects(
-                        category_id=category_obj,
+                        category_id=ObjectId(category_id),
                         question__iexact=user_query
-                    ).first()
+                    ).only('id', 'answer').first()
 
                     if matching_question:
                         print("✅ Found DB match, returning cached answer")
+                        record_question_hit(category_id, matching_question.id)
                         return ChatResponse(
                             response=matching_question.answer,
                             session_id=request.session_id,
@@ -179,6 +186,7 @@ async def chat_endpoint(request: ChatRequest, x_api_key: str = Header(..., alias
             product_context,
             request.session_id,
              x_api_key,  
+            include_similar=request.include_similar,
         )
 
         return ChatResponse(
@@ -1,36 +1,27 @@
 # api/v1/endpoints/orders.py
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from typing import Optional, List
 
 from models.order_schemas import (
     OrderVerifyRequest, OrderVerifyResponse,
     AuthCheckRequest, AuthCheckResponse,
     OrderContext, OrderListItem,
+    MutateOrderResponse, CancelOrderRequest, ReturnRequestCreate,
 )
 from services.auth import verify_api_key, check_rate_limit
 from services.order_auth import (
-    check_order_verify_rate_limit,
-    verify_customer_token,
-    verify_guest_order,
-    issue_verify_token,
+    run_auth_check,
+    run_order_verify,
     validate_verify_token,
 )
-from services.shopify_order_adapter import ShopifyOrderAdapter
+from services.shopify_order_adapter import ShopifyOrderAdapter, adapter_for_config, order_snapshot_cache
 
 router = APIRouter()
 
 
 def _get_adapter(config: dict) -> ShopifyOrderAdapter:
-    """
-    Build platform adapter from merchant config (resolved via verify_api_key).
-    Swap this for WooCommerce/custom-connector adapter based on config['platform'].
-    """
-    if config.get("platform") != "shopify":
-        raise HTTPException(status_code=501, detail="Platform not yet supported for order lookup")
-    return ShopifyOrderAdapter(
-        shop_domain=config["shop_domain"],
-        access_token=config["shopify_access_token"],
-    )
+    """Pooled platform adapter for the merchant config (resolved via verify_api_key)."""
+    return adapter_for_config(config)
 
 
 @router.post("/orders/auth-check", response_model=AuthCheckResponse)
@@ -42,18 +33,7 @@ async def auth_check(
     Authenticated-path: host platform passes customer_token/customer_id.
     We independently verify against Shopify before trusting it.
     """
-    config = verify_api_key(x_api_key)
-    check_rate_limit(x_api_key, config.get("rate_limit", 100))
-
-    adapter = _get_adapter(config)
-    verified_id = await verify_customer_token(
-        request.customer_token, request.customer_id, adapter
-    )
-
-    return AuthCheckResponse(
-        authenticated=verified_id is not None,
-        customer_id=verified_id,
-    )
+    return await run_auth_check(x_api_key, request.customer_id, request.customer_token)
 
 
 @router.post("/orders/verify", response_model=OrderVerifyResponse)
@@ -66,30 +46,10 @@ async def verify_order(
     Guest-path: order_number + email/phone_last4 → order_id + short-lived verify_token.
     Stricter rate-limit than general chat — enumeration-guard.
     """
-    config = verify_api_key(x_api_key)
-    check_order_verify_rate_limit(x_api_key, session_id)  # separate stricter bucket
-
-    if not request.email and not request.phone_last4:
-        raise HTTPException(
-            status_code=400,
-            detail="Provide email or phone (last 4 digits) to verify order ownership",
-        )
-
-    adapter = _get_adapter(config)
-    order_id = await verify_guest_order(
-        request.order_number, request.email, request.phone_last4, adapter
+    return await run_order_verify(
+        x_api_key, session_id, request.order_number, request.email, request.phone_last4
     )
 
-    if not order_id:
-        # generic message — never reveal which field mismatched
-        return OrderVerifyResponse(
-            verified=False,
-            message="We couldn't find a matching order. Please double-check your order number and email.",
-        )
-
-    token = issue_verify_token(order_id)
-    return OrderVerifyResponse(verified=True, order_id=order_id, verify_token=token)
-
 
 @router.get("/orders/status", response_model=OrderContext)
 async def get_order_status(
@@ -118,35 +78,48 @@ async def get_order_status(
             raise HTTPException(status_code=403, detail="Verification token does not match this order")
 
     adapter = _get_adapter(config)
-    order = await adapter.get_order(order_id)
+    # One fetch gives both the order and its owner for the customer_id path
+    order, owner_id = await adapter.get_order_with_owner(order_id)
 
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     # If customer_id path, confirm this order actually belongs to them
     if customer_id and not verify_token:
-        owns_order = await adapter.order_belongs_to_customer(order_id, customer_id)
-        if not owns_order:
+        if owner_id != str(customer_id):
             raise HTTPException(status_code=403, detail="Order not found")  # generic — don't reveal it exists for someone else
 
     return order
 
 
+@router.get("/orders/cache-stats")
+async def order_cache_stats(x_api_key: str = Header(..., alias="X-API-Key")):
+    """Order snapshot cache size / hits / misses / hit_rate (per worker)."""
+    verify_api_key(x_api_key)
+    return {"order_snapshot_cache": order_snapshot_cache.stats()}
+
+
 @router.get("/orders/list", response_model=List[OrderListItem])
 async def list_customer_orders(
     customer_id: str,
+    response: Response,
+    limit: int = Query(10, ge=1, le=250),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     x_api_key: str = Header(..., alias="X-API-Key"),
 ):
     """
     Authenticated-path only. customer_id must already be verified via
     /orders/auth-check in this session — this endpoint itself does not
     re-verify (caller/bot-orchestration layer responsible for sequencing).
+    Paged: when more orders exist, X-Next-Cursor holds the cursor for the next call.
     """
     config = verify_api_key(x_api_key)
     check_rate_limit(x_api_key, config.get("rate_limit", 100))
 
     adapter = _get_adapter(config)
-    orders = await adapter.list_orders_by_customer(customer_id)
+    orders, next_cursor = await adapter.list_orders_page(customer_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return orders
 @router.post("/orders/cancel", response_model=MutateOrderResponse)
 async def cancel_order_endpoint(
@@ -175,8 +148,8 @@ async def cancel_order_endpoint(
     adapter = _get_adapter(config)
     
     if customer_id and not verify_token:
-        owns = await adapter.order_belongs_to_customer(request.order_id, customer_id)
-        if not owns:
+        _, owner_id = await adapter.get_order_with_owner(request.order_id)
+        if owner_id != str(customer_id):
             raise HTTPException(status_code=403, detail="Order not found")  # generic
     
     # Idempotency check (TODO: proper idempotency-key in production)
@@ -229,8 +202,9 @@ async def create_return_endpoint(
     adapter = _get_adapter(config)
     
     if customer_id and not verify_token:
-        owns = await adapter.order_belongs_to_customer(request.order_id, customer_id)
-        if not owns:
+        # Fetched order stays in the snapshot cache for create_return's eligibility read
+        _, owner_id = await adapter.get_order_with_owner(request.order_id)
+        if owner_id != str(customer_id):
             raise HTTPException(status_code=403, detail="Order not found")
     
     result = await adapter.create_return(
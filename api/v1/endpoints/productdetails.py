@@ -2,11 +2,17 @@ from typing import Optional
 from dateutil import parser
 from datetime import datetime
 from fastapi import APIRouter, Header, HTTPException
-from models.schemas import ChatRequest, ChatResponse, ProductRequest, ShopifyProduct,product_category
+from models.schemas import ChatRequest, ChatResponse, ProductRequest, ShopifyProduct,product_category, category_denormalized_fields, product_display_fields, product_numeric_fields, bump_catalog_version, get_catalog_version
 from mongoengine import ReferenceField
 from services.auth import verify_api_key, check_rate_limit
+from services.product_search import product_search_index
+from services.product_bitmap_index import product_bitmap_index
+from services.product_suggest import product_suggest_index
+from services.filter_options import schedule_filter_options_sync
+from services.cache import TTLCache
 from typing import Dict, Any
 import os
+import re
 import asyncio
 import httpx
 import logging
@@ -16,6 +22,9 @@ SHOPIFY_STORE = os.getenv("SHOPIFY_STORE")
 SHOPIFY_ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
 router = APIRouter()
 
+PRODUCT_CONTEXT_TTL_SEC = 300
+product_context_cache = TTLCache(ttl_seconds=PRODUCT_CONTEXT_TTL_SEC, maxsize=2048)
+
 
 def parse_shopify_date(date_str: str) -> Optional[datetime]:
     if not date_str:
@@ -28,6 +37,22 @@ def parse_shopify_date(date_str: str) -> Optional[datetime]:
         return None
 
 
+# Bookkeeping only — a re-sync that changes nothing but these isn't a catalog change
+NON_CATALOG_FIELDS = {"_id", "last_synced", "created_at", "updated_at", "shopify_updated_at"}
+
+
+def _catalog_fields_changed(existing_product: ShopifyProduct, product_doc: dict) -> bool:
+    """
+    Compare an incoming product_doc with the stored product on catalog-visible
+    fields. Both go through the model so defaults and references compare alike.
+    """
+    stored = ShopifyProduct._from_son(existing_product.to_mongo()).to_mongo()
+    incoming = ShopifyProduct(**product_doc).to_mongo()
+    # Only the fields this sync writes — attributes etc. are maintained elsewhere
+    keys = set(product_doc) - NON_CATALOG_FIELDS
+    return any(stored.get(key) != incoming.get(key) for key in keys)
+
+
 async def save_product_to_db(product_data: dict):
     product_type_name=product_data.get('product_type',"").strip()
     category_obj=None
@@ -63,85 +88,126 @@ async def save_product_to_db(product_data: dict):
         "created_at": parse_shopify_date(product_data.get("created_at")),
         "updated_at": parse_shopify_date(product_data.get("updated_at")),
         "shopify_updated_at": parse_shopify_date(product_data.get("updated_at")),
-        "category_id": category_obj
+        "last_synced": datetime.utcnow(),
+        "category_id": category_obj,
+        **category_denormalized_fields(category_obj),
     }
+    product_doc.update(product_display_fields(product_doc["handle"], product_doc["variants"]))
 
     existing_product = ShopifyProduct.objects(_id=product_doc["_id"]).first()
+    # Shopify payloads carry no finder attributes — keep the ones already stored
+    existing_attributes = existing_product.attributes if existing_product else {}
+    previous_category = existing_product.to_mongo().get("category_id") if existing_product else None
+    product_doc.update(product_numeric_fields(product_doc["variants"], existing_attributes))
     if existing_product:
-
+        changed = _catalog_fields_changed(existing_product, product_doc)
         existing_product.update(**product_doc)
+        if changed:
+            # Only real changes move ETags / clear read caches — a cache-miss
+            # re-fetch of an unchanged product must not
+            bump_catalog_version()
         saved_product = ShopifyProduct.objects(_id=product_doc["_id"]).first()
     else:
-
+        changed = True
         saved_product = ShopifyProduct(**product_doc)
         saved_product.save()
     logger.info(f"Saved Shopify product ID: {saved_product._id}")
     print("Saved product with ID:", saved_product._id)
-    return saved_product.to_dict()
+    saved_dict = saved_product.to_dict()
+    if not changed:
+        return saved_dict
+    # The bump above (or save()'s) already updated this worker's version
+    # state — passing it lets the in-memory indexes stay current without a rescan
+    version = get_catalog_version()
+    product_search_index.upsert(saved_dict, version)
+    product_bitmap_index.upsert(saved_dict, version)
+    product_suggest_index.upsert(saved_dict, version)
+    # Refresh both categories' filter options when a product moves between them
+    schedule_filter_options_sync(previous_category, category_obj.id if category_obj else None)
+    return saved_dict
+
+
+async def fetch_product_context(product_id: str) -> Dict[str, Any]:
+    """Fetch a product from Shopify, store it, and return the chat product context."""
+    logger.info(f"Fetching Shopify product ID: {product_id}")
+    url = f"https://{SHOPIFY_STORE}/admin/api/2024-10/products/{product_id}.json"
+    headers = {
+        "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
+        "Content-Type": "application/json",
+    }
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+    product_data = response.json().get('product')
+    if not product_data:
+        raise HTTPException(status_code=404, detail="Product not found")
+    logger.info(f"Fetched product: {product_data['title']}")
+
+    variants = product_data.get('variants', [])
+    first_variant = variants[0] if variants else {}
+
+    product_context = {
+        'productId': int(product_data.get('id')),
+        'sku': first_variant.get('sku') or str(product_data.get('id')),
+        'title': product_data.get('title'),
+        'name': product_data.get('title'),
+        'description': strip_html_tags(product_data.get('body_html', '')),
+        'price': float(first_variant.get('price', 0)),
+        'currency': 'USD',
+        'brand': product_data.get('vendor', ''),
+        'vendor': product_data.get('vendor', ''),
+        'category': product_data.get('product_type', ''),
+        'type': product_data.get('product_type', ''),
+        'images': [img.get('src') for img in product_data.get('images', [])],
+        'url': f"https://{SHOPIFY_STORE.replace('.myshopify.com', '')}/products/{product_data.get('handle')}",
+        'handle': product_data.get('handle'),
+        'inStock': first_variant.get('inventory_quantity', 0) > 0,
+        'available': first_variant.get('inventory_quantity', 0) > 0,
+        'variants': [
+            {
+                'id': v.get('id'),
+                'title': v.get('title'),
+                'sku': v.get('sku', ''),
+                'price': float(v.get('price', 0)),
+                'available': v.get('inventory_quantity', 0) > 0,
+                'inventory_quantity': v.get('inventory_quantity', 0)
+            }
+            for v in variants[:10]
+        ]
+    }
+    logger.info(f"Transformed product context:")
+    logger.info(f"  - ID: {product_context['productId']}")
+    logger.info(f"  - SKU: {product_context['sku']}")
+    logger.info(f"  - Title: {product_context['title']}")
+    logger.info(
+        f"  - Description length: {len(product_context.get('description', ''))}")
+
+    await save_product_to_db(product_data)
+    logger.info(f"Saved Shopify product ID: {product_id}")
+    return product_context
+
+
+async def get_product_context(product_id: str) -> Dict[str, Any]:
+    """
+    Chat product context, served from product_context_cache when warm (e.g.
+    by /bootstrap) so repeat chats skip the Shopify round trip.
+    """
+    # Same entry for a plain id and a gid://shopify/Product/<id>
+    match = re.search(r"(\d+)$", str(product_id))
+    key = match.group(1) if match else str(product_id)
+    cached = product_context_cache.get(key)
+    if cached is None:
+        cached = await fetch_product_context(key)
+        product_context_cache.set(key, cached)
+    return dict(cached)
 
 
 @router.post('/product')
 async def get_product_details(product_id: str, x_api_key: str) -> Dict[str, Any]:
     try:
-        logger.info(f"Fetching Shopify product ID: {product_id}")
         config = verify_api_key(x_api_key)
         check_rate_limit(x_api_key, config['rate_limit'])
-        url = f"https://{SHOPIFY_STORE}/admin/api/2024-10/products/{product_id}.json"
-        headers = {
-            "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
-            "Content-Type": "application/json",
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-        product_data = response.json().get('product')
-        if not product_data:
-            raise HTTPException(status_code=404, detail="Product not found")
-        logger.info(f"Fetched product: {product_data['title']}")
-
-        variants = product_data.get('variants', [])
-        first_variant = variants[0] if variants else {}
-
-        product_context = {
-            'productId': int(product_data.get('id')),
-            'sku': first_variant.get('sku') or str(product_data.get('id')),
-            'title': product_data.get('title'),
-            'name': product_data.get('title'),
-            'description': strip_html_tags(product_data.get('body_html', '')),
-            'price': float(first_variant.get('price', 0)),
-            'currency': 'USD',
-            'brand': product_data.get('vendor', ''),
-            'vendor': product_data.get('vendor', ''),
-            'category': product_data.get('product_type', ''),
-            'type': product_data.get('product_type', ''),
-            'images': [img.get('src') for img in product_data.get('images', [])],
-            'url': f"https://{SHOPIFY_STORE.replace('.myshopify.com', '')}/products/{product_data.get('handle')}",
-            'handle': product_data.get('handle'),
-            'inStock': first_variant.get('inventory_quantity', 0) > 0,
-            'available': first_variant.get('inventory_quantity', 0) > 0,
-            'variants': [
-                {
-                    'id': v.get('id'),
-                    'title': v.get('title'),
-                    'sku': v.get('sku', ''),
-                    'price': float(v.get('price', 0)),
-                    'available': v.get('inventory_quantity', 0) > 0,
-                    'inventory_quantity': v.get('inventory_quantity', 0)
-                }
-                for v in variants[:10]
-            ]
-        }
-        logger.info(f"Transformed product context:")
-        logger.info(f"  - ID: {product_context['productId']}")
-        logger.info(f"  - SKU: {product_context['sku']}")
-        logger.info(f"  - Title: {product_context['title']}")
-        logger.info(
-            f"  - Description length: {len(product_context.get('description', ''))}")
-
-        await save_product_to_db(product_data)
-        logger.info(f"Saved Shopify product ID: {product_id}")
-
-        return product_context
+        return await get_product_context(product_id)
     except httpx.HTTPStatusError as e:
         logger.error(f"Shopify API error: {e}")
         raise HTTPException(status_code=e.response.status_code,
@@ -1,26 +1,31 @@
-from fastapi import APIRouter, Header, HTTPException, Request, Query
+from fastapi import APIRouter, Header, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from typing import List
-from models.schemas import product_category, QuestionResponse, ShopifyProduct, filter
+from models.schemas import product_category, QuestionResponse, ShopifyProduct, get_catalog_version
 from services.auth import verify_api_key
 from bson import ObjectId
-import pandas as pd
+import orjson
+import re
 from typing import Optional, Dict
-from spellchecker import SpellChecker
+from services.product_search import product_search_index
+from services.product_bitmap_index import product_bitmap_index
+from services.product_suggest import product_suggest_index
+from services.similar_products import get_similar_products
+from services.cache import TTLCache
+from services.http_cache import check_not_modified
+from services.catalog_cache import get_category_filters, get_category_subtree, get_end_level_categories, get_product_category_id
 router = APIRouter()
 
 
 @router.get('/fourth_level_categories')
-async def fourth_level_categories_view(x_api_key: str = Header(..., alias='X-API-KEY')):
+async def fourth_level_categories_view(request: Request, response: Response,
+                                       x_api_key: str = Header(..., alias='X-API-KEY')):
     try:
         verify_api_key(x_api_key)
-        categories_cursor = product_category.objects(end_level=True)
-        categories_list = []
-        for ins in categories_cursor:
-            cat = {
-                "id": str(ins.id),
-                "name": ins.name,
-            }
-            categories_list.append(cat)
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        categories_list = get_end_level_categories()
         return {"data": {"categories": categories_list}}
     except Exception as e:
         print(f"Error fetching categories: {e}")
@@ -41,15 +46,316 @@ ATTRIBUTE_MAP: Dict[str, str] = {
     "load_type":        "Load Type",
     "smart_features":   "Smart Features",
 }
-BASE_QUERY_PARAMS = {"category", "search", "brand"}
+BASE_QUERY_PARAMS = {"category", "search", "brand", "sort", "fields", "stream"}
+# Range params: min_<key> / max_<key> → numeric field normalized at ingest
+NUMERIC_RANGE_FIELDS: Dict[str, str] = {
+    "price":        "min_price",
+    "screen_size":  "screen_size_in",
+    "capacity":     "capacity_kg",
+    "refresh_rate": "refresh_rate_hz",
+}
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/300"
+
+# /products response fields → aggregation expressions (category/handle/price
+# are denormalized onto the product at write time)
+PRODUCT_FIELDS: Dict[str, object] = {
+    "id":          {"$toString": "$_id"},
+    "shopify_id":  "$_id",
+    "handle":      {"$ifNull": ["$url_handle", ""]},
+    "variant_id":  {"$ifNull": [{"$first": "$variants.id"}, None]},
+    "image":       {"$cond": [{"$eq": [{"$ifNull": ["$image_url", ""]}, ""]},
+                              PLACEHOLDER_IMAGE, "$image_url"]},
+    "title":       {"$ifNull": ["$title", "Untitled"]},
+    "sku":         {"$ifNull": [{"$first": "$variants.sku"}, "N/A"]},
+    "category":    {"$ifNull": ["$category_name", "Uncategorized"]},
+    "breadcrumb":  {"$ifNull": ["$category_breadcrumb", ""]},
+    "price":       {"$ifNull": ["$display_price", {"$literal": "$0 USD"}]},
+    "description": {"$ifNull": ["$body_html", ""]},
+    "tags":        {"$ifNull": ["$tags", []]},
+    "brand":       {"$ifNull": ["$brand", ""]},
+    "vendor":      {"$ifNull": ["$vendor", ""]},
+}
+# fields= presets — `card` is what the widget grid renders
+FIELD_PRESETS: Dict[str, List[str]] = {
+    "card": ["id", "title", "image", "price", "handle"],
+    "full": list(PRODUCT_FIELDS),
+}
+
+
+STREAM_BATCH_SIZE = 200
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json":   "application/json",
+}
+
+
+def _stream_products(pipeline: list, mode: str):
+    """
+    Iterate the aggregation cursor and serialize each product as it arrives —
+    NDJSON lines, or the regular {"products": [...]} body written incrementally.
+    """
+    cursor = ShopifyProduct._get_collection().aggregate(pipeline, batchSize=STREAM_BATCH_SIZE)
+    if mode == "ndjson":
+        for product in cursor:
+            yield orjson.dumps(product, default=str) + b"\n"
+        return
+    yield b'{"products":['
+    first = True
+    for product in cursor:
+        yield (b"" if first else b",") + orjson.dumps(product, default=str)
+        first = False
+    yield b"]}"
+
+
+def _no_products(stream: Optional[str], response: Response):
+    """Empty result in the same shape (and media type) a full one would have."""
+    if not stream:
+        return {"products": []}
+    body = b"" if stream == "ndjson" else b'{"products":[]}'
+    return StreamingResponse(iter([body]), media_type=STREAM_MEDIA_TYPES[stream],
+                             headers=dict(response.headers))
+
+
+def _product_projection(fields: Optional[str]) -> Dict[str, object]:
+    """fields=card | full | comma-separated names (presets can be mixed in). `id` is always returned."""
+    requested: List[str] = []
+    for name in (fields or "full").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name in FIELD_PRESETS:
+            requested.extend(FIELD_PRESETS[name])
+        elif name in PRODUCT_FIELDS:
+            requested.append(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown field '{name}'")
+    projection: Dict[str, object] = {"_id": 0, "id": PRODUCT_FIELDS["id"]}
+    for name in requested:
+        projection[name] = PRODUCT_FIELDS[name]
+    return projection
+
+PRICE_BUCKETS = [0, 250, 500, 1000, 2000, 5000]
+FACET_CACHE_TTL_SEC = 300
+facet_cache = TTLCache(ttl_seconds=FACET_CACHE_TTL_SEC, maxsize=2048)
+
+
+def _build_filter_state(request: Request, category: Optional[str], brand: Optional[str],
+                        search_query: Optional[str]):
+    """
+    Translate finder query params into Mongo conditions.
+    Returns (base_match, selected, range_match, search_rank):
+      base_match  — category / search conditions every facet shares
+      selected    — facet key → (field, condition) for brand + ATTRIBUTE_MAP filters
+      range_match — min_/max_ conditions on the numeric fields
+      search_rank — product _id → rank when a search term was given
+    Returns None when the query cannot match anything.
+    """
+    base_match: Dict[str, object] = {}
+    selected: Dict[str, tuple] = {}
+    range_match: Dict[str, Dict[str, float]] = {}
+    
+    if category:
+        try:
+            base_match["category_id"] = ObjectId(category)
+        except Exception:
+            return None
+    
+    if brand:
+        selected["brand"] = ("brand", {"$in": [b.strip() for b in brand.split(",")]})
+    
+    # Free-text search resolves through the in-process index (typo tolerant)
+    search_rank: Optional[Dict[int, int]] = None
+    if search_query and search_query.strip():
+        ranked_ids = product_search_index.search(search_query.strip())
+        if ranked_ids is None:
+            # Index still building — plain substring match, unranked
+            base_match["$or"] = _search_fallback_match(search_query.strip())
+        elif not ranked_ids:
+            return None
+        else:
+            search_rank = {pid: i for i, pid in enumerate(ranked_ids)}
+            base_match["_id"] = {"$in": ranked_ids}
+    
+    for raw_key, raw_val in request.query_params.items():
+        q_key = raw_key.strip().replace(" ", "_").lower()
+        bound, _, range_key = q_key.partition("_")
+        if bound in ("min", "max") and range_key in NUMERIC_RANGE_FIELDS:
+            try:
+                limit = float(raw_val)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{raw_key} must be a number")
+            operator = "$gte" if bound == "min" else "$lte"
+            range_match.setdefault(NUMERIC_RANGE_FIELDS[range_key], {})[operator] = limit
+            continue
+        if q_key in BASE_QUERY_PARAMS or q_key not in ATTRIBUTE_MAP:
+            continue
+        values: List[str] = [v.strip() for v in raw_val.split(",") if v.strip()]
+        if values:
+            attr_name = ATTRIBUTE_MAP[q_key]
+            selected[q_key] = (f"attributes.{attr_name}", {"$in": values})
+    
+    return base_match, selected, range_match, search_rank
+
+
+def _search_fallback_match(search_query: str) -> List[dict]:
+    pattern = {"$regex": re.escape(search_query), "$options": "i"}
+    return [{"title": pattern}, {"brand": pattern}, {"vendor": pattern}, {"variants.sku": pattern}]
+
+
+def _sort_stage(sort: Optional[str]) -> Optional[dict]:
+    """sort=price / sort=-screen_size etc. — leading '-' for descending."""
+    if not sort:
+        return None
+    key = sort.strip().lower()
+    direction = -1 if key.startswith("-") else 1
+    field = NUMERIC_RANGE_FIELDS.get(key.lstrip("-"))
+    if not field:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort must be one of: {', '.join(NUMERIC_RANGE_FIELDS)} (prefix '-' for descending)",
+        )
+    return {"$sort": {field: direction, "_id": 1}}
+
+
+def _facet_cache_key(category: Optional[str], search_query: Optional[str], selected: Dict[str, tuple],
+                     range_match: Dict[str, Dict[str, float]]):
+    return (
+        get_catalog_version(),
+        category or "",
+        (search_query or "").strip().lower(),
+        tuple(sorted((key, tuple(sorted(cond["$in"]))) for key, (_, cond) in selected.items())),
+        tuple(sorted((field, tuple(sorted(bounds.items()))) for field, bounds in range_match.items())),
+    )
+
+
+def _price_bucket_label(lower) -> str:
+    if isinstance(lower, str):
+        return lower
+    upper = PRICE_BUCKETS[PRICE_BUCKETS.index(lower) + 1]
+    return f"{lower}-{upper}"
+
+
+@router.get('/products/facets')
+async def get_product_facets(
+    request: Request,
+    response: Response,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    category: Optional[str] = Query(None),
+    search_query: Optional[str] = Query(None, alias="search"),
+    brand: Optional[str] = Query(None),
+):
+    """
+    Option counts for brand, price bucket and every ATTRIBUTE_MAP attribute
+    under the current filter state, in one $facet aggregation. Each facet
+    ignores its own selection so sibling options keep their counts.
+    """
+    try:
+        verify_api_key(x_api_key)
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        filter_state = _build_filter_state(request, category, brand, search_query)
+        if filter_state is None:
+            return {"data": {"total": 0, "facets": {}}}
+        base_match, selected, range_match, _ = filter_state
+        base_match = {**base_match, **range_match}
+        
+        cache_key = _facet_cache_key(category, search_query, selected, range_match)
+        cached = facet_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        def _others(exclude: Optional[str]) -> Dict[str, object]:
+            return {field: cond for key, (field, cond) in selected.items() if key != exclude}
+        
+        def _count_by(field_expr: str, exclude: str, unwind: bool = False) -> list:
+            stages = [{"$match": _others(exclude)}]
+            if unwind:
+                # List-valued attributes count once per value; scalars pass through
+                stages.append({"$unwind": field_expr})
+            return stages + [
+                {"$group": {"_id": field_expr, "count": {"$sum": 1}}},
+                {"$match": {"_id": {"$nin": [None, ""]}}},
+                {"$sort": {"_id": 1}},
+            ]
+        
+        facet_stages = {
+            "total": [{"$match": _others(None)}, {"$count": "count"}],
+            "brand": _count_by("$brand", "brand"),
+            "price": [
+                {"$match": _others(None)},
+                {"$bucket": {
+                    # Same field as the price range filter and sort
+                    "groupBy": {"$ifNull": ["$min_price", 0]},
+                    "boundaries": PRICE_BUCKETS,
+                    "default": f"{PRICE_BUCKETS[-1]}+",
+                    "output": {"count": {"$sum": 1}},
+                }},
+            ],
+        }
+        for q_key, attr_name in ATTRIBUTE_MAP.items():
+            facet_stages[q_key] = _count_by(f"$attributes.{attr_name}", q_key, unwind=True)
+        
+        pipeline = [{"$match": base_match}, {"$facet": facet_stages}]
+        result = next(iter(ShopifyProduct.objects.aggregate(*pipeline)), {})
+        
+        facets: Dict[str, list] = {}
+        for key, rows in result.items():
+            if key == "total":
+                continue
+            if key == "price":
+                facets[key] = [
+                    {"value": _price_bucket_label(row["_id"]), "count": row["count"]}
+                    for row in rows
+                ]
+            else:
+                facets[key] = [{"value": row["_id"], "count": row["count"]} for row in rows]
+        total_rows = result.get("total") or [{"count": 0}]
+        
+        payload = {"data": {"total": total_rows[0]["count"], "facets": facets}}
+        facet_cache.set(cache_key, payload)
+        return payload
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching facets: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/products/suggest')
+async def suggest_products(
+    request: Request,
+    response: Response,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """
+    Search-box typeahead: brands, categories, product titles and SKUs
+    starting with q, from the in-memory prefix index (no Mongo query).
+    """
+    try:
+        verify_api_key(x_api_key)
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        return {"data": {"query": q, "suggestions": product_suggest_index.suggest(q, limit)}}
+    except Exception as e:
+        print(f"Error fetching suggestions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @router.get('/products')
 async def get_products_filtered(
     request: Request,
+    response: Response,
     x_api_key: str = Header(..., alias="X-API-KEY"),
     category: Optional[str] = Query(None),
     search_query: Optional[str] = Query(None, alias="search"),
     brand: Optional[str] = Query(None),
+    sort: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    stream: Optional[str] = Query(None, description="ndjson | json — stream results as they are read"),
 ):
     print("\n" + "=" * 60)
     print("🔍 GET /products REQUEST")
@@ -59,87 +365,55 @@ async def get_products_filtered(
     print("=" * 60 + "\n")
     try:
         verify_api_key(x_api_key)
-        match: Dict[str, object] = {}
+        if stream and stream not in STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"stream must be one of: {', '.join(STREAM_MEDIA_TYPES)}")
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        filter_state = _build_filter_state(request, category, brand, search_query)
+        if filter_state is None:
+            return _no_products(stream, response)
+        base_match, selected, range_match, search_rank = filter_state
+        sort_stage = _sort_stage(sort)
+        projection = _product_projection(fields)
+        match: Dict[str, object] = dict(base_match)
+        for field, condition in selected.values():
+            match[field] = condition
         
-        if category:
-            try:
-                match["category_id"] = ObjectId(category)
-            except Exception:
-                return {"products": []}
-        
-        if brand:
-            match["brand"] = {"$in": [b.strip() for b in brand.split(",")]}
-        
-        for raw_key, raw_val in request.query_params.items():
-            q_key = raw_key.strip().replace(" ", "_").lower()
-            if q_key in BASE_QUERY_PARAMS or q_key not in ATTRIBUTE_MAP:
-                continue
-            values: List[str] = [v.strip() for v in raw_val.split(",") if v.strip()]
-            if values:
-                attr_name = ATTRIBUTE_MAP[q_key]
-                match[f"attributes.{attr_name}"] = {"$in": values}
+        # Resolve the filter combination from the in-memory bitmap snapshot;
+        # Mongo then only does a primary-key fetch
+        matched_ids = product_bitmap_index.resolve(match) if match else None
+        if matched_ids is not None:
+            if not matched_ids:
+                return _no_products(stream, response)
+            match = {"_id": {"$in": matched_ids}}
+        match.update(range_match)
         
+        # category name/breadcrumb are denormalized onto the product — no $lookup
         pipeline = [
             {"$match": match},
-            {"$lookup": {
-                "from":         "product_category",
-                "localField":   "category_id",
-                "foreignField": "_id",
-                "as":           "product_category_ins"}},
-            {"$unwind": "$product_category_ins"},
         ]
+        if sort_stage:
+            pipeline.append(sort_stage)
         
-        if search_query and search_query.strip():
-            s = search_query.strip()
-            pipeline.append({"$match": {
-                "$or": [
-                    {"brand_name":   {"$regex": s, "$options": "i"}},
-                    {"product_name": {"$regex": s, "$options": "i"}},
-                    {"sku_number_product_code_item_number": {
-                        "$regex": s, "$options": "i"}},
-                ]}})
+        if stream:
+            if search_rank is not None and not sort_stage:
+                # Keep search ranking without buffering: order inside the aggregation
+                ranked_ids = list(search_rank)
+                pipeline.append({"$addFields": {"_search_rank": {"$indexOfArray": [ranked_ids, "$_id"]}}})
+                pipeline.append({"$sort": {"_search_rank": 1}})
+            pipeline.append({"$project": projection})
+            return StreamingResponse(
+                _stream_products(pipeline, stream),
+                media_type=STREAM_MEDIA_TYPES[stream],
+                headers=dict(response.headers),
+            )
         
-        pipeline.append({
-            "$project": {
-                "_id": 0,
-                "id":          {"$toString": "$_id"},
-                "shopify_id":  "$_id",
-                "handle":      {"$ifNull": ["$handle", ""]},
-                "variant_id":  {"$ifNull": [{"$first": "$variants.id"}, None]},
-                "image":       {"$ifNull": ["$image_url", "https://via.placeholder.com/300"]},
-                "title":       {"$ifNull": ["$title", "Untitled"]},
-                "sku":         {"$ifNull": [{"$first": "$variants.sku"}, "N/A"]},
-                "category":    {"$ifNull": ["$product_category_ins.name", "Uncategorized"]},
-                "breadcrumb":  {"$ifNull": ["$product_category_ins.breadcrumb", ""]},
-                "price":       {"$ifNull": [{"$first": "$variants.price"}, 0]},
-                "description": {"$ifNull": ["$body_html", ""]},
-                "tags":        {"$ifNull": ["$tags", []]},
-                "brand":       {"$ifNull": ["$brand", ""]},
-                "vendor":      {"$ifNull": ["$vendor", ""]},
-            }})
+        pipeline.append({"$project": projection})
         
         product_list = list(ShopifyProduct.objects.aggregate(*pipeline))
-        
-        for p in product_list:
-            p["price"] = f"${p.get('price', 0)} USD"
-            
-            # ✅ CLEAN THE HANDLE - Remove quotes and invalid characters
-            if p.get("handle"):
-                handle = p["handle"]
-                # Remove quotes and other invalid URL characters
-                handle = handle.replace('"', '').replace("'", '')
-                handle = handle.lower().replace(' ', '-').replace('/', '-')
-                # Remove any other special characters except hyphens and alphanumeric
-                import re
-                handle = re.sub(r'[^a-z0-9-]', '', handle)
-                # Replace multiple hyphens with single
-                handle = re.sub(r'-+', '-', handle)
-                # Remove leading/trailing hyphens
-                handle = handle.strip('-')
-                p["handle"] = handle
-            
-            if not p.get('image'):
-                p['image'] = 'https://via.placeholder.com/300'
+        if search_rank is not None and not sort_stage:
+            product_list.sort(key=lambda p: search_rank.get(int(p["id"]), len(search_rank)))
         
         print(f'✅ Found {len(product_list)} products')
         if product_list:
@@ -147,15 +421,77 @@ async def get_products_filtered(
         
         return {"products": product_list}
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get('/products/{product_id}/similar')
+async def similar_products_view(
+    request: Request,
+    response: Response,
+    product_id: int,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    limit: int = Query(8, ge=1, le=50),
+    cheaper: bool = Query(False, description="Only products priced below this one"),
+):
+    """Precomputed similar products (see services.similar_products)."""
+    try:
+        verify_api_key(x_api_key)
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        similar = get_similar_products(product_id, limit=limit, cheaper=cheaper)
+        if similar is None:
+            # Products alone in their category are never scored — only an
+            # unknown id is a 404
+            if get_product_category_id(product_id) is None:
+                raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+            similar = []
+        products = [{**p, "image": p.get("image") or PLACEHOLDER_IMAGE} for p in similar]
+        return {"data": {"product_id": str(product_id), "products": products}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching similar products: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/categories/tree')
+async def category_tree_view(
+    request: Request,
+    response: Response,
+    root: Optional[str] = Query(None, description="Category id — return only its subtree"),
+    x_api_key: str = Header(..., alias='X-API-KEY'),
+):
+    """
+    Full category hierarchy (or one subtree) for navigation menus.
+    Materialized from a single query and cached until the next catalog write.
+    """
+    try:
+        verify_api_key(x_api_key)
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        categories = get_category_subtree(root)
+        if categories is None:
+            raise HTTPException(status_code=404, detail=f"Category {root} not found")
+        return {"data": {"categories": categories}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching category tree: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/category/{category_id}", response_model=dict)
 async def get_single_category(
     category_id: str,
+    request: Request,
+    response: Response,
     x_api_key: str = Header(..., alias="X-API-KEY")
 ):
     """
@@ -163,6 +499,9 @@ async def get_single_category(
     so the widget can build the collection handle.
     """
     verify_api_key(x_api_key)
+    not_modified = check_not_modified(request, response)
+    if not_modified:
+        return not_modified
     try:
         cat = product_category.objects.get(id=ObjectId(category_id))
         return {
@@ -178,34 +517,26 @@ async def get_single_category(
 
 
 @router.get('/category_filters')
-async def category_filters_view(category_id: str = Query(...),  x_api_key: str = Header(..., alias='X-API-KEY')):
+async def category_filters_view(request: Request, response: Response, category_id: str = Query(...),
+                                x_api_key: str = Header(..., alias='X-API-KEY')):
     try:
         verify_api_key(x_api_key)
-        category_obj = product_category.objects.get(id=ObjectId(category_id))
-        category_name = category_obj.name
-        filters_cursor = filter.objects(category_id=ObjectId(category_id))
-        filters_list = []
-        for ins in filters_cursor:
-            f = ins.to_mongo().to_dict()
-            f.pop('_id', None)
-            f.pop('category_id', None)
-            if f.get('config', {}).get('options', []):
-                for key, value in f.items():
-                    if pd.isna(value) or value == float('nan'):
-                        f[key] = None
-                filters_list.append(f)
-        filters_list = sorted(
-            filters_list, key=lambda x: x.get('name', '').lower())
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        payload = get_category_filters(category_id)
+        if payload is None:
+            raise HTTPException(
+                status_code=404, detail=f"Category {category_id} not found")
         return {
             "data": {
                 "category_id": category_id,
-                "category_name": category_name,
-                "filters": filters_list
+                "category_name": payload["category_name"],
+                "filters": payload["filters"]
             }
         }
-    except product_category.DoesNotExist:
-        raise HTTPException(
-            status_code=404, detail=f"Category {category_id} not found")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching filters: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,35 +1,31 @@
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from typing import List
-from models.schemas import QuestionResponse
+from models.schemas import QuestionResponse, get_questions_version
 from services.auth import verify_api_key
-from bson import ObjectId
-from models.schemas import product_questions,ShopifyProduct
+from services.http_cache import check_not_modified
+from services.catalog_cache import get_category_questions, get_product_category_id
 
 router = APIRouter()
 @router.get('/questions', response_model=List[QuestionResponse])
-async def get_product_questions(product_id:str,x_api_key:str=Header(...,alias='X-API-KEY')):
+async def get_product_questions(product_id:str,request:Request,response:Response,x_api_key:str=Header(...,alias='X-API-KEY'),
+                                limit:int=Query(6,ge=1,le=50)):
     try:
         verify_api_key(x_api_key)
-        print('product0d',product_id)
-        product_obj = ShopifyProduct.objects.get(_id=product_id)
-        pipeline = [
-        {
-            "$match" : {
-                "category_id" : product_obj.category_id.id
-            }
-        },
-        {
-            "$project" : {
-                "_id" : 0,
-                "id" : {"$toString" : "$_id"},
-                "question" : 1
-            }
-        },
-        # {"$limit" : 6}
-    ]
-        product_questions_list = list(product_questions.objects.aggregate(*(pipeline)))
-        return product_questions_list
+        not_modified = check_not_modified(request, response, get_questions_version)
+        if not_modified:
+            return not_modified
+        if not product_id.isdigit():
+            raise HTTPException(status_code=400, detail="product_id must be numeric")
+        # Cached product → category lookup; no full ShopifyProduct load
+        category_id = get_product_category_id(int(product_id))
+        if category_id is None:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+        if not category_id:
+            return []
+        # Ranking is precomputed (most asked first) — only the top N ship
+        return get_category_questions(category_id)[:limit]
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"error123: {e}")
         raise HTTPException(status_code=500,detail=str(e))
-    
\ No newline at end of file
@@ -0,0 +1,62 @@
+# api/v1/endpoints/webhooks.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from services.auth import API_KEYS
+from services.shopify_order_adapter import apply_order_webhook
+
+router = APIRouter()
+
+# Shopify app's API secret — signs every webhook body (X-Shopify-Hmac-Sha256)
+SHOPIFY_WEBHOOK_SECRET = os.getenv("SHOPIFY_WEBHOOK_SECRET")
+
+
+def _valid_shopify_hmac(body: bytes, signature: str) -> bool:
+    digest = hmac.new(SHOPIFY_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature or "")
+
+
+def _is_configured_shop(shop_domain: str) -> bool:
+    return any(
+        config.get("platform") == "shopify" and config.get("shop_domain") == shop_domain
+        for config in API_KEYS.values()
+    )
+
+
+@router.post("/webhooks/shopify")
+async def shopify_webhook(
+    request: Request,
+    x_shopify_topic: str = Header(..., alias="X-Shopify-Topic"),
+    x_shopify_shop_domain: str = Header(..., alias="X-Shopify-Shop-Domain"),
+    x_shopify_hmac_sha256: str = Header(..., alias="X-Shopify-Hmac-Sha256"),
+):
+    """
+    Receiver for orders/* and fulfillments/* webhooks — keeps the local
+    order mirror current. Answers 200 for topics we ignore so Shopify
+    doesn't retry them.
+    """
+    if not SHOPIFY_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhooks not configured")
+    body = await request.body()
+    if not _valid_shopify_hmac(body, x_shopify_hmac_sha256):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    if not _is_configured_shop(x_shopify_shop_domain):
+        raise HTTPException(status_code=404, detail="Unknown shop")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    try:
+        handled = apply_order_webhook(x_shopify_shop_domain, x_shopify_topic, payload)
+    except Exception as e:
+        print(f"⚠️ order webhook {x_shopify_topic} failed: {e}")
+        # 500 → Shopify retries the delivery
+        raise HTTPException(status_code=500, detail="Webhook processing failed")
+    return {"received": True, "handled": handled}
@@ -1,6 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.v1.api import api_router
+from services.question_popularity import flush_question_hits
+from services.shopify_order_adapter import shopify_adapters
+from services.product_bitmap_index import product_bitmap_index
+from services.product_search import product_search_index
+from services.product_suggest import product_suggest_index
 app = FastAPI(title="Product Chatbot API")
 app.add_middleware(
     CORSMiddleware,
@@ -10,6 +15,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(api_router, prefix="/api/v1")
+
+
+@app.on_event("startup")
+async def build_catalog_indexes():
+    # Full scans run in worker threads; requests use Mongo until they land
+    product_bitmap_index.schedule_refresh()
+    product_search_index.schedule_refresh()
+    product_suggest_index.schedule_refresh()
+
+
+@app.on_event("shutdown")
+async def flush_pending_counters():
+    # Don't lose FAQ hit counts that haven't hit their batch flush yet
+    flush_question_hits()
+
+
+@app.on_event("shutdown")
+async def close_shopify_clients():
+    await shopify_adapters.close_all()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,8 +1,20 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 from enum import Enum
 from datetime import datetime
 
+class OrderStatus(str, Enum):
+    placed = "placed"
+    processing = "processing"
+    shipped = "shipped"
+    partially_shipped = "partially_shipped"
+    out_for_delivery = "out_for_delivery"
+    delivered = "delivered"
+    cancelled = "cancelled"
+    refunded = "refunded"
+    partially_refunded = "partially_refunded"
+
+
 class OrderListItem(BaseModel):
     order_id: str
     order_number: str
@@ -42,17 +54,6 @@ class OrderActionError(BaseModel):
     error_code: str  # NOT_ELIGIBLE, NOT_VERIFIED, ALREADY_CANCELLED, PLATFORM_ERROR
     message: str  # safe, generic — no internal details
 
-class OrderStatus(str, Enum):
-    placed = "placed"
-    processing = "processing"
-    shipped = "shipped"
-    partially_shipped = "partially_shipped"
-    out_for_delivery = "out_for_delivery"
-    delivered = "delivered"
-    cancelled = "cancelled"
-    refunded = "refunded"
-    partially_refunded = "partially_refunded"
-
 
 class OrderLineItem(BaseModel):
     sku: Optional[str] = None
@@ -6,8 +6,9 @@ from mongoengine import connect
 from typing import Dict, Any, Optional  
 from mongoengine import ReferenceField
 import os
+import re
+import time
 import asyncio
-import pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -35,6 +36,7 @@ class ChatRequest(BaseModel):
     product_context: Dict[str, Any]  
     product_id: Optional[str] = None 
     session_id: Optional[str] = None
+    include_similar: bool = False  # add precomputed similar products to the AI prompt
 class ChatResponse(BaseModel):
     response: str
     session_id: str
@@ -42,7 +44,68 @@ class ChatResponse(BaseModel):
 class QuestionResponse(BaseModel):
     id:str
     question:str
-class product_category(Document):
+class catalog_version(Document):
+    """Named version counters — "catalog" is bumped on every catalog write, "questions"
+    on FAQ popularity flushes. They drive ETags and read caches."""
+    id = fields.StringField(primary_key=True)
+    version = fields.IntField(default=0)
+
+
+# Other workers' bumps are picked up within this many seconds
+CATALOG_VERSION_POLL_SEC = 5
+_catalog_version_state = {"version": None, "checked_at": 0.0}
+# FAQ popularity ranking — moves with chat traffic, so it gets its own counter
+# instead of churning every catalog ETag and cache
+_questions_version_state = {"version": None, "checked_at": 0.0}
+
+
+def _bump_version(counter_id: str, state: dict) -> int:
+    doc = catalog_version.objects(id=counter_id).modify(
+        upsert=True, new=True, inc__version=1)
+    state.update(version=doc.version, checked_at=time.monotonic())
+    return doc.version
+
+
+def _get_version(counter_id: str, state: dict) -> int:
+    now = time.monotonic()
+    if state["version"] is None or now - state["checked_at"] > CATALOG_VERSION_POLL_SEC:
+        doc = catalog_version.objects(id=counter_id).first()
+        state.update(version=doc.version if doc else 0, checked_at=now)
+    return state["version"]
+
+
+def bump_catalog_version() -> int:
+    return _bump_version("catalog", _catalog_version_state)
+
+
+def get_catalog_version() -> int:
+    return _get_version("catalog", _catalog_version_state)
+
+
+def bump_questions_version() -> int:
+    return _bump_version("questions", _questions_version_state)
+
+
+def get_questions_version() -> tuple:
+    """Version of /questions payloads — catalog edits and popularity flushes both move it."""
+    return get_catalog_version(), _get_version("questions", _questions_version_state)
+
+
+class CatalogVersionedMixin:
+    """Document mixin — every save/delete bumps the catalog version."""
+
+    def save(self, *args, **kwargs):
+        saved = super().save(*args, **kwargs)
+        bump_catalog_version()
+        return saved
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_catalog_version()
+        return result
+
+
+class product_category(CatalogVersionedMixin, Document):
     name = fields.StringField(required=True)
     level = fields.IntField(default=0)
     parent_category_id = fields.ReferenceField('self', null=True)
@@ -54,6 +117,20 @@ class product_category(Document):
     code = fields.StringField()
     end_level = fields.BooleanField(default=False)
     industry_id_str = fields.StringField()
+
+    meta = {
+        "indexes": ["end_level"]
+    }
+
+    def save(self, *args, **kwargs):
+        # name/breadcrumb are denormalized onto shopify_products — fan out renames
+        changed = set(self._get_changed_fields()) if self.pk else set()
+        saved = super().save(*args, **kwargs)
+        if changed & {"name", "breadcrumb"}:
+            propagate_category_to_products(saved)
+        if "name" in changed:
+            rebuild_category_filters_payload(saved)
+        return saved
 class ConfigResponse(BaseModel):
     theme:dict
     position:str
@@ -119,7 +196,7 @@ class product(Document):
     ai_generated_description = fields.ListField(fields.DictField())
     ai_generated_features = fields.ListField(fields.DictField())
 from mongoengine import Document, IntField, StringField, ListField, DictField, DateTimeField, FloatField
-class ShopifyProduct(Document):
+class ShopifyProduct(CatalogVersionedMixin, Document):
     _id = IntField(primary_key=True)  
     title = StringField(required=True)
     vendor = StringField()
@@ -135,6 +212,17 @@ class ShopifyProduct(Document):
     shopify_updated_at = DateTimeField()  
     last_synced = DateTimeField(default=datetime.utcnow)
     category_id = ReferenceField('product_category', null=True)
+    # Denormalized from product_category at write time (see propagate_category_to_products)
+    category_name = StringField()
+    category_breadcrumb = StringField()
+    # Response-ready values computed at ingest (see product_display_fields)
+    url_handle = StringField()
+    display_price = StringField()
+    # Numeric values normalized at ingest for range filters / sorting (see product_numeric_fields)
+    min_price = FloatField()
+    screen_size_in = FloatField()
+    capacity_kg = FloatField()
+    refresh_rate_hz = FloatField()
     
     # ===== NEW FIELDS FOR EXCEL DATA =====
     
@@ -173,12 +261,26 @@ class ShopifyProduct(Document):
     
     meta = {
         "collection": "shopify_products",
+        # Built by `python -m services.catalog_maintenance sync-indexes`, never
+        # implicitly on first request — large builds must not block serving
+        "auto_create_index": False,
+        "index_background": True,
         "indexes": [
             "sku",
             "vendor",
             "product_type",
             "category_1",
-            "category_id"
+            "category_id",
+            "url_handle",
+            # Product finder: category browse narrowed by brand
+            ("category_id", "brand"),
+            # Product finder: numeric range filters / sort within a category
+            ("category_id", "min_price"),
+            ("category_id", "screen_size_in"),
+            ("category_id", "capacity_kg"),
+            ("category_id", "refresh_rate_hz"),
+            # Incremental jobs: products touched since the last run
+            "last_synced",
         ]
     }
     
@@ -199,6 +301,14 @@ class ShopifyProduct(Document):
             "shopify_updated_at": self.shopify_updated_at,
             "last_synced": self.last_synced,
             "category_id": str(self.category_id.id) if self.category_id else None,
+            "category_name": self.category_name,
+            "category_breadcrumb": self.category_breadcrumb,
+            "url_handle": self.url_handle,
+            "display_price": self.display_price,
+            "min_price": self.min_price,
+            "screen_size_in": self.screen_size_in,
+            "capacity_kg": self.capacity_kg,
+            "refresh_rate_hz": self.refresh_rate_hz,
             
             # New fields in to_dict
             "category_1": self.category_1,
@@ -223,13 +333,147 @@ class ShopifyProduct(Document):
             "connectivity": self.connectivity,
             "attributes": self.attributes
         }
-class product_questions(Document):
+
+
+# Indexes MongoEngine's meta cannot express — created by the same sync command.
+# attributes.<Name> $in filters from the finder are served by the wildcard index.
+SHOPIFY_PRODUCT_RAW_INDEXES = [
+    ([("attributes.$**", 1)], {"name": "attributes_wildcard"}),
+]
+
+
+def category_denormalized_fields(category_obj) -> dict:
+    """Category fields copied onto ShopifyProduct so the finder needs no $lookup."""
+    if not category_obj:
+        return {"category_name": None, "category_breadcrumb": None}
+    return {
+        "category_name": category_obj.name,
+        "category_breadcrumb": category_obj.breadcrumb or "",
+    }
+
+
+_HANDLE_INVALID_RE = re.compile(r'[^a-z0-9-]')
+_HANDLE_HYPHENS_RE = re.compile(r'-+')
+
+
+def normalize_url_handle(handle: Optional[str]) -> str:
+    """Storefront-safe handle: lowercase, hyphenated, [a-z0-9-] only."""
+    if not handle:
+        return ""
+    handle = handle.replace('"', '').replace("'", '')
+    handle = handle.lower().replace(' ', '-').replace('/', '-')
+    handle = _HANDLE_INVALID_RE.sub('', handle)
+    handle = _HANDLE_HYPHENS_RE.sub('-', handle)
+    return handle.strip('-')
+
+
+def format_display_price(price) -> str:
+    return f"${price if price is not None else 0} USD"
+
+
+def product_display_fields(handle: Optional[str], variants: Optional[list]) -> dict:
+    """Response-ready handle/price stored on ShopifyProduct at write time."""
+    first_variant = (variants or [{}])[0] or {}
+    return {
+        "url_handle": normalize_url_handle(handle),
+        "display_price": format_display_price(first_variant.get("price", 0)),
+    }
+
+
+_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def _parse_number(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value).replace(',', ''))
+    return float(match.group(1)) if match else None
+
+
+_SCREEN_SIZE_RE = re.compile(r'(\d+(?:\.\d+)?)[\s-]*(cm|inches|inch|in\b|"|”|\'\')?')
+
+
+def parse_screen_size_in(value) -> Optional[float]:
+    """'55\"', '55 inch', '139 cm', '55 inch (139 cm)' → inches"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    # Unit is read off each number — an inch reading wins over a cm one
+    matches = _SCREEN_SIZE_RE.findall(str(value).replace(',', '').lower())
+    if not matches:
+        return None
+    for number, unit in matches:
+        if unit and unit != 'cm':
+            return float(number)
+    for number, unit in matches:
+        if unit == 'cm':
+            return round(float(number) / 2.54, 1)
+    return float(matches[0][0])
+
+
+def parse_capacity_kg(value) -> Optional[float]:
+    """'7 kg', '15.5 lbs' → kg. Volume units (cu ft, L) aren't convertible."""
+    number = _parse_number(value)
+    if number is None:
+        return None
+    unit = str(value).lower()
+    if 'lb' in unit:
+        return round(number * 0.4536, 1)
+    if 'kg' in unit or not re.search(r'[a-z]', unit):
+        return number
+    return None
+
+
+def parse_refresh_rate_hz(value) -> Optional[float]:
+    """'120Hz', '60 Hz' → 120.0, 60.0"""
+    return _parse_number(value)
+
+
+def product_numeric_fields(variants: Optional[list], attributes: Optional[dict]) -> dict:
+    """Numeric finder fields stored on ShopifyProduct at write time."""
+    attributes = attributes or {}
+    prices = [p for p in (_parse_number((v or {}).get("price")) for v in variants or []) if p is not None]
+    return {
+        "min_price": min(prices) if prices else None,
+        "screen_size_in": parse_screen_size_in(attributes.get("Screen Size")),
+        "capacity_kg": parse_capacity_kg(attributes.get("Capacity")),
+        "refresh_rate_hz": parse_refresh_rate_hz(attributes.get("Refresh Rate")),
+    }
+
+
+def propagate_category_to_products(category_obj) -> int:
+    """
+    Fan-out update after a product_category rename — rewrites the
+    denormalized name/breadcrumb on every product in that category.
+    """
+    fields_ = category_denormalized_fields(category_obj)
+    updated = ShopifyProduct.objects(category_id=category_obj.id).update(
+        set__category_name=fields_["category_name"],
+        set__category_breadcrumb=fields_["category_breadcrumb"],
+    )
+    if updated:
+        bump_catalog_version()
+    print(f"🔄 Category '{category_obj.name}' propagated to {updated} products")
+    return updated
+
+
+class product_questions(CatalogVersionedMixin, Document):
     question = fields.StringField()
     answer = fields.StringField()
     question_type = fields.StringField()
     product_id = fields.ReferenceField(product)
     category_id = fields.ReferenceField(product_category)
-class filter(Document):
+    # /chat FAQ hits — incremented in batches by services.question_popularity
+    popularity = fields.IntField(default=0)
+
+    meta = {
+        # /questions lists a category's questions on every product page view
+        "indexes": ["category_id", ("category_id", "-popularity")]
+    }
+class filter(CatalogVersionedMixin, Document):
     category_id = fields.ReferenceField(product_category, required=True)
     name = fields.StringField(required=True)
     filter_type = fields.StringField(
@@ -238,8 +482,119 @@ class filter(Document):
     )
     display_order = fields.IntField(default=0)
     config = fields.DictField(default={})
-    
+
+    def clean(self):
+        # Spreadsheet imports leave NaN floats behind — store them as null
+        self.config = _strip_nan(self.config)
+
+    def save(self, *args, **kwargs):
+        saved = super().save(*args, **kwargs)
+        rebuild_category_filters_payload(saved.category_id)
+        return saved
+
+    def delete(self, *args, **kwargs):
+        category_obj = self.category_id
+        result = super().delete(*args, **kwargs)
+        rebuild_category_filters_payload(category_obj)
+        return result
+
+
+class category_filters_payload(Document):
+    """
+    Ready-to-serve /category_filters body per category, rebuilt whenever
+    the category's filters (or its name) change.
+    """
+    id = fields.ObjectIdField(primary_key=True)  # product_category id
+    category_name = fields.StringField()
+    filters = fields.ListField(fields.DictField())
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+
+
+class product_similarities(Document):
+    """
+    Precomputed top-k similar products for one ShopifyProduct, with the
+    card fields inlined so /products/{id}/similar is a single _id read.
+    Written by services.similar_products.compute_similar_products.
+    """
+    id = fields.IntField(primary_key=True)  # ShopifyProduct _id
+    min_price = fields.FloatField()
+    similar = fields.ListField(fields.DictField())
+    similar_cheaper = fields.ListField(fields.DictField())  # top-k among strictly cheaper products
+    computed_at = fields.DateTimeField(default=datetime.utcnow)
+
+
+class job_checkpoint(Document):
+    """Last successful run of an incremental catalog job, keyed by job name."""
+    id = fields.StringField(primary_key=True)
+    last_run = fields.DateTimeField()
+
+
+class order_mirror(Document):
+    """
+    Normalized OrderContext per Shopify order, kept current by order
+    webhooks and live reads. Holds no raw PII — the email is only stored
+    hashed and the phone as its last 4 digits, for guest-path matching.
+    Maintained by services.order_mirror.
+    """
+    id = fields.StringField(primary_key=True)  # "<shop_domain>:<order_id>"
+    shop_domain = fields.StringField(required=True)
+    order_id = fields.StringField(required=True)
+    order_number = fields.StringField()
+    customer_id = fields.StringField()
+    email_hash = fields.StringField()
+    phone_last4 = fields.StringField()
+    context = fields.DictField()  # OrderContext, JSON-serialized
+    order_updated_at = fields.DateTimeField()  # Shopify's updated_at — drops out-of-order webhooks
+    mirrored_at = fields.DateTimeField()  # None = stale, next read goes live
+    stale_at = fields.DateTimeField()  # when last marked stale — older observations can't clear it
+    meta = {
+        "indexes": [
+            {"fields": ["shop_domain", "order_number"], "unique": True},
+            ("shop_domain", "customer_id"),
+            ("shop_domain", "email_hash"),
+        ]
+    }
+
+
+def _strip_nan(value):
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, dict):
+        return {k: _strip_nan(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_strip_nan(v) for v in value]
+    return value
+
+
+def rebuild_category_filters_payload(category_obj) -> Optional[dict]:
+    """
+    Recompute one category's filter payload: filters with options only,
+    NaN-free, sorted by name. Returns the stored payload (None if the
+    category no longer exists).
+    """
+    if category_obj is None:
+        return None
+    category_id = getattr(category_obj, "id", category_obj)
+    category_doc = product_category._get_collection().find_one({"_id": category_id}, {"name": 1})
+    if not category_doc:
+        category_filters_payload.objects(id=category_id).delete()
+        return None
+    filters_list = []
+    for doc in filter._get_collection().find({"category_id": category_id}, {"_id": 0, "category_id": 0}):
+        if (doc.get("config") or {}).get("options"):
+            filters_list.append(_strip_nan(doc))
+    filters_list.sort(key=lambda f: (f.get("name") or "").lower())
+    category_filters_payload(
+        id=category_id,
+        category_name=category_doc.get("name"),
+        filters=filters_list,
+        updated_at=datetime.utcnow(),
+    ).save()
+    return {"category_name": category_doc.get("name"), "filters": filters_list}
+
+
 def save_questions_from_excel(file_path):
+    import pandas as pd  # import-time only — keeps pandas out of the API process
     df=pd.read_excel(file_path)
     for _,row in df.iterrows():
         category_names=[
@@ -551,7 +906,6 @@ def save_questions_from_excel(file_path):
 # Example usage:
 # result = save_shopify_products_from_excel("/home/lexicon/Downloads/Shopify - Appliances - Product Finder (1).xlsx")
 # print(f"Import completed: {result}")
-import pandas as pd
 from collections import defaultdict
 
 def save_filters_from_excel(file_path):
@@ -559,6 +913,7 @@ def save_filters_from_excel(file_path):
     Reads Excel file and creates filter documents for each End Level category
     based on the attributes present in the data.
     """
+    import pandas as pd  # import-time only — keeps pandas out of the API process
     df = pd.read_excel(file_path)
     
     # Define attribute mappings for different categories
@@ -714,6 +1069,8 @@ def delete_filters_by_category(category_name):
     
     count = filter.objects(category_id=category_obj).count()
     filter.objects(category_id=category_obj).delete()
+    rebuild_category_filters_payload(category_obj)
+    bump_catalog_version()
     print(f"🗑 Deleted {count} filters for category '{category_name}'")
     return count
 
@@ -724,6 +1081,8 @@ def delete_all_filters():
     """
     count = filter.objects.count()
     filter.objects.delete()
+    category_filters_payload.objects.delete()
+    bump_catalog_version()
     print(f"🗑 Deleted {count} filters from database")
     return count
 
@@ -30,38 +30,3 @@ def check_rate_limit(api_key:str,limit:int=100):
     if len(rate_limit_store[api_key])>=limit:
         raise HTTPException(status_code=429,detail='Rate limit exceeded')
     rate_limit_store[api_key].append(now)
-    
-async def _call_internal_auth_check(customer_id: str, customer_token, x_api_key: str) -> dict:
-    """Internal helper — calls our own /orders/auth-check (for orchestration layer)"""
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(
-            "http://localhost:8000/api/v1/orders/auth-check",  # or use base_url from config
-            headers={"X-API-Key": x_api_key, "Content-Type": "application/json"},
-            json={"customer_id": customer_id, "customer_token": customer_token},
-        )
-        return resp.json()
-
-
-async def _call_internal_verify(
-    order_number: str,
-    email: str,
-    phone_last4: str,
-    session_id: str,
-    x_api_key: str,
-) -> dict:
-    """Internal helper — calls our own /orders/verify"""
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(
-            "http://localhost:8000/api/v1/orders/verify",
-            headers={
-                "X-API-Key": x_api_key,
-                "X-Session-Id": session_id,
-                "Content-Type": "application/json",
-            },
-            json={
-                "order_number": order_number,
-                "email": email,
-                "phone_last4": phone_last4,
-            },
-        )
-        return resp.json()
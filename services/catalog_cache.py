@@ -0,0 +1,163 @@
+# services/catalog_cache.py
+"""
+Ready-to-serve catalog payloads for the widget's read endpoints, cached
+per catalog version so any catalog write invalidates them.
+"""
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+from models.schemas import (
+    ShopifyProduct,
+    category_filters_payload,
+    get_catalog_version,
+    get_questions_version,
+    product_category,
+    product_questions,
+    rebuild_category_filters_payload,
+)
+from services.cache import VersionedCache
+
+catalog_cache = VersionedCache(get_catalog_version, maxsize=4096)
+# Kept apart so per-product entries can't evict the category payloads
+product_category_cache = VersionedCache(get_catalog_version, maxsize=50000)
+# Popularity flushes reorder questions without touching the catalog version
+questions_cache = VersionedCache(get_questions_version, maxsize=4096)
+
+
+def _break_parent_cycles(parent_of: Dict[str, Optional[str]]):
+    """
+    Corrupt or hand-edited links can form loops (A→A, A→B→A). Walk each
+    parent chain once; every category on a loop becomes a root, so none
+    drops out of the tree and no subtree references itself.
+    """
+    done = set()
+    for start in parent_of:
+        path: List[str] = []
+        position: Dict[str, int] = {}
+        node_id = start
+        while node_id in parent_of and node_id not in done:
+            if node_id in position:
+                for cycle_id in path[position[node_id]:]:
+                    parent_of[cycle_id] = None
+                break
+            position[node_id] = len(path)
+            path.append(node_id)
+            node_id = parent_of[node_id]
+        done.update(path)
+
+
+def _load_category_tree() -> dict:
+    """
+    Whole product_category hierarchy from one projected query.
+    Returns {"roots": [...], "nodes": {id: node}} — nodes share children lists.
+    """
+    docs = list(product_category._get_collection().find(
+        {},
+        {"name": 1, "level": 1, "breadcrumb": 1, "end_level": 1,
+         "parent_category_id": 1, "child_categories": 1},
+    ))
+    nodes: Dict[str, dict] = {}
+    parent_of: Dict[str, Optional[str]] = {}
+    for doc in docs:
+        node_id = str(doc["_id"])
+        nodes[node_id] = {
+            "id": node_id,
+            "name": doc.get("name"),
+            "level": doc.get("level", 0),
+            "breadcrumb": doc.get("breadcrumb") or "",
+            "end_level": bool(doc.get("end_level")),
+            "children": [],
+        }
+        parent = doc.get("parent_category_id")
+        parent_of[node_id] = str(parent) if parent else None
+    # child_categories fills in links that were only recorded on the parent side
+    for doc in docs:
+        for child in doc.get("child_categories") or []:
+            child_id = str(child)
+            if child_id in nodes and not parent_of.get(child_id):
+                parent_of[child_id] = str(doc["_id"])
+
+    _break_parent_cycles(parent_of)
+
+    roots: List[dict] = []
+    for node_id, node in nodes.items():
+        parent_id = parent_of.get(node_id)
+        if parent_id and parent_id in nodes:
+            nodes[parent_id]["children"].append(node)
+        else:
+            roots.append(node)
+    for node in nodes.values():
+        node["children"].sort(key=lambda n: (n["name"] or "").lower())
+    roots.sort(key=lambda n: (n["name"] or "").lower())
+    return {"roots": roots, "nodes": nodes}
+
+
+def get_category_tree() -> dict:
+    return catalog_cache.get_or_load("category_tree", _load_category_tree)
+
+
+def get_category_subtree(category_id: Optional[str] = None) -> Optional[List[dict]]:
+    """Top-level nodes, or [node] for one category's subtree; None if unknown."""
+    tree = get_category_tree()
+    if not category_id:
+        return tree["roots"]
+    node = tree["nodes"].get(category_id)
+    return [node] if node else None
+
+
+def _load_end_level_categories() -> List[dict]:
+    cursor = product_category._get_collection().find({"end_level": True}, {"name": 1})
+    return [{"id": str(doc["_id"]), "name": doc.get("name")} for doc in cursor]
+
+
+def get_end_level_categories() -> List[dict]:
+    """id/name of every end-level category — served on each finder page view."""
+    return catalog_cache.get_or_load("end_level_categories", _load_end_level_categories)
+
+
+def _load_category_filters(category_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(category_id):
+        return None
+    doc = category_filters_payload._get_collection().find_one({"_id": ObjectId(category_id)})
+    if doc is None:
+        # Not materialized yet (pre-existing data) — build it once now
+        return rebuild_category_filters_payload(ObjectId(category_id))
+    return {"category_name": doc.get("category_name"), "filters": doc.get("filters") or []}
+
+
+def get_category_filters(category_id: str) -> Optional[dict]:
+    """Precomputed {category_name, filters} for a category; None if unknown."""
+    return catalog_cache.get_or_load(
+        ("category_filters", category_id), lambda: _load_category_filters(category_id)
+    )
+
+
+def _load_product_category_id(product_id: int) -> Optional[str]:
+    doc = ShopifyProduct._get_collection().find_one({"_id": product_id}, {"category_id": 1})
+    if doc is None:
+        return None
+    return str(doc["category_id"]) if doc.get("category_id") else ""
+
+
+def get_product_category_id(product_id: int) -> Optional[str]:
+    """Category id of a product ("" if uncategorized); None if the product is unknown."""
+    return product_category_cache.get_or_load(product_id, lambda: _load_product_category_id(product_id))
+
+
+def _category_questions_key(category_id: str) -> tuple:
+    return ("category_questions", category_id)
+
+
+def _load_category_questions(category_id: str) -> List[dict]:
+    cursor = product_questions._get_collection().find(
+        {"category_id": ObjectId(category_id)}, {"question": 1}
+    ).sort([("popularity", -1), ("_id", 1)])
+    return [{"id": str(doc["_id"]), "question": doc.get("question")} for doc in cursor]
+
+
+def get_category_questions(category_id: str) -> List[dict]:
+    """id/question of a category's suggested questions, most asked first."""
+    return questions_cache.get_or_load(
+        _category_questions_key(category_id), lambda: _load_category_questions(category_id)
+    )
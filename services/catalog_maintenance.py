@@ -0,0 +1,185 @@
+# services/catalog_maintenance.py
+"""
+One-off / scheduled maintenance jobs for the product catalog.
+
+Run from the project root, e.g.:
+    python -m services.catalog_maintenance backfill-categories
+"""
+import argparse
+import sys
+from typing import List
+
+from pymongo import UpdateOne
+
+from models.schemas import (
+    SHOPIFY_PRODUCT_RAW_INDEXES,
+    ShopifyProduct,
+    bump_catalog_version,
+    product_category,
+    product_questions,
+    product_display_fields,
+    product_numeric_fields,
+    propagate_category_to_products,
+    rebuild_category_filters_payload,
+)
+from services.filter_options import sync_filter_options
+from services.similar_products import compute_similar_products
+
+BULK_BATCH_SIZE = 1000
+
+
+def backfill_category_fields() -> dict:
+    """
+    Populate the denormalized category_name/category_breadcrumb on every
+    ShopifyProduct from its product_category. Safe to re-run.
+    """
+    categories = 0
+    products = 0
+    for category_obj in product_category.objects.only("id", "name", "breadcrumb"):
+        products += propagate_category_to_products(category_obj)
+        categories += 1
+    print(f"✅ Backfilled category fields: {categories} categories, {products} products")
+    return {"categories": categories, "products": products}
+
+
+def _bulk_set_derived_fields(projection: dict, compute) -> int:
+    """Stream shopify_products and $set compute(doc) on each, in batches."""
+    collection = ShopifyProduct._get_collection()
+    ops = []
+    updated = 0
+    for doc in collection.find({}, projection):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": compute(doc)}))
+        if len(ops) >= BULK_BATCH_SIZE:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+    if updated:
+        bump_catalog_version()
+    return updated
+
+
+def backfill_display_fields() -> dict:
+    """
+    Compute url_handle/display_price for every ShopifyProduct so /products
+    can serve them straight from the aggregation. Safe to re-run.
+    """
+    updated = _bulk_set_derived_fields(
+        {"handle": 1, "variants.price": 1},
+        lambda doc: product_display_fields(doc.get("handle"), doc.get("variants")),
+    )
+    print(f"✅ Backfilled display fields on {updated} products")
+    return {"updated": updated}
+
+
+def backfill_numeric_fields() -> dict:
+    """
+    Compute min_price / screen_size_in / capacity_kg / refresh_rate_hz for
+    every ShopifyProduct so the finder's range filters and sort see them.
+    """
+    updated = _bulk_set_derived_fields(
+        {"variants.price": 1, "attributes": 1},
+        lambda doc: product_numeric_fields(doc.get("variants"), doc.get("attributes")),
+    )
+    print(f"✅ Backfilled numeric fields on {updated} products")
+    return {"updated": updated}
+
+
+def rebuild_filter_payloads() -> dict:
+    """
+    Re-materialize the /category_filters payload for every category.
+    Run once after deploy, or after editing filters directly in Mongo.
+    """
+    rebuilt = 0
+    for doc in product_category._get_collection().find({}, {"_id": 1}):
+        if rebuild_category_filters_payload(doc["_id"]) is not None:
+            rebuilt += 1
+    bump_catalog_version()
+    print(f"✅ Rebuilt filter payloads for {rebuilt} categories")
+    return {"categories": rebuilt}
+
+
+def sync_product_indexes() -> List[str]:
+    """
+    Create every declared shopify_products / product_category /
+    product_questions index with background builds. Existing indexes are
+    left alone, so this is safe to run on each deploy.
+    """
+    product_category.ensure_indexes()
+    product_questions.ensure_indexes()
+    ShopifyProduct.ensure_indexes()
+    collection = ShopifyProduct._get_collection()
+    for keys, opts in SHOPIFY_PRODUCT_RAW_INDEXES:
+        collection.create_index(keys, background=True, **opts)
+    names = sorted(collection.index_information())
+    print(f"✅ shopify_products indexes: {', '.join(names)}")
+    return names
+
+
+def _winning_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "inputStages"):
+        child = plan.get(child_key)
+        for sub in (child if isinstance(child, list) else [child] if child else []):
+            stages.extend(_winning_stages(sub))
+    return stages
+
+
+def _finder_sample_queries() -> List[dict]:
+    """$match shapes produced by the product finder, filled from a real product."""
+    sample = ShopifyProduct._get_collection().find_one(
+        {"category_id": {"$ne": None}, "attributes": {"$ne": {}}},
+        {"category_id": 1, "brand": 1, "attributes": 1},
+    )
+    if not sample:
+        return []
+    category_id = sample["category_id"]
+    queries = [{"category_id": category_id}]
+    if sample.get("brand"):
+        queries.append({"category_id": category_id, "brand": {"$in": [sample["brand"]]}})
+    for name, value in list(sample.get("attributes", {}).items())[:3]:
+        queries.append({"category_id": category_id, f"attributes.{name}": {"$in": [value]}})
+        queries.append({f"attributes.{name}": {"$in": [value]}})
+    return queries
+
+
+def check_finder_indexes() -> bool:
+    """
+    Explain each finder query shape and fail if any winning plan is a
+    collection scan. Run after sync-indexes / in the benchmark job.
+    """
+    collection = ShopifyProduct._get_collection()
+    queries = _finder_sample_queries()
+    if not queries:
+        print("⚠ No categorized products with attributes — nothing to check")
+        return True
+    ok = True
+    for query in queries:
+        plan = collection.find(query).explain()["queryPlanner"]["winningPlan"]
+        stages = _winning_stages(plan)
+        uses_index = "COLLSCAN" not in stages
+        ok = ok and uses_index
+        print(f"{'✅' if uses_index else '❌'} {query} → {' < '.join(filter(None, stages))}")
+    return ok
+
+
+COMMANDS = {
+    "backfill-categories": backfill_category_fields,
+    "backfill-display-fields": backfill_display_fields,
+    "backfill-numeric-fields": backfill_numeric_fields,
+    "rebuild-filter-payloads": rebuild_filter_payloads,
+    "sync-filter-options": sync_filter_options,
+    "rebuild-filter-options": lambda: sync_filter_options(full=True),
+    "compute-similar-products": compute_similar_products,
+    "sync-indexes": sync_product_indexes,
+    "check-finder-indexes": check_finder_indexes,
+}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Catalog maintenance jobs")
+    arg_parser.add_argument("command", choices=sorted(COMMANDS))
+    args = arg_parser.parse_args()
+    result = COMMANDS[args.command]()
+    if result is False:
+        sys.exit(1)
@@ -0,0 +1,103 @@
+# services/catalog_snapshot.py
+"""
+Base for the per-worker in-memory catalog indexes (bitmap, search, suggest).
+
+A snapshot remembers the catalog version it was built at. Catalog writes
+from any worker, the maintenance CLI or the Excel imports bump that
+version, so a snapshot whose version no longer matches is rebuilt in a
+worker thread — the full collection scan never runs on the event loop.
+Builds fill a fresh instance and swap it in under the lock, so readers
+keep the old snapshot until the new one is complete.
+
+Writes this process makes itself are applied incrementally: upsert() and
+remove() take the catalog version the write produced, and if that write
+was the only one since the snapshot's version, the snapshot moves to it
+without a rescan.
+"""
+import asyncio
+import threading
+from typing import Iterable, Optional
+
+from models.schemas import ShopifyProduct, get_catalog_version
+
+
+class CatalogSnapshot:
+    # Raw-collection projection — only what the index reads
+    INDEX_PROJECTION: dict = {}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._built_version: Optional[int] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def is_current(self) -> bool:
+        return self._built and self._built_version == get_catalog_version()
+
+    def _advance_version(self, version: Optional[int]):
+        """
+        Call under the lock after applying the write that bumped the catalog
+        to `version`. Only a single-step move is safe — any gap means another
+        writer's change is missing, and the next query schedules a rebuild.
+        """
+        if version is not None and self._built_version is not None and self._built_version == version - 1:
+            self._built_version = version
+
+    # ------------------------------------------------------------
+    # Build / refresh
+    # ------------------------------------------------------------
+    def _load(self, docs: Iterable[dict]) -> int:
+        """Fill this (fresh, unshared) instance from docs; returns product count."""
+        raise NotImplementedError
+
+    def _summary(self) -> str:
+        raise NotImplementedError
+
+    def build(self, docs: Optional[Iterable[dict]] = None) -> int:
+        """Full rebuild. Reads shopify_products directly when no docs given. Blocking."""
+        # Read before scanning — a write landing mid-scan leaves the snapshot
+        # one version behind and triggers another rebuild, never a missed one
+        version = get_catalog_version()
+        if docs is None:
+            docs = ShopifyProduct._get_collection().find({}, self.INDEX_PROJECTION)
+        fresh = type(self)()
+        count = fresh._load(docs)
+        with self._lock:
+            for name, value in vars(fresh).items():
+                if name not in ("_lock", "_refresh_task"):
+                    setattr(self, name, value)
+            self._built = True
+            self._built_version = version
+        print(f"{self._summary()} (catalog v{version})")
+        return count
+
+    def refresh(self) -> bool:
+        """Rebuild if missing or behind the catalog version. Blocking."""
+        if self.is_current():
+            return False
+        self.build()
+        return True
+
+    def schedule_refresh(self):
+        """Rebuild in a worker thread when stale; at most one rebuild in flight."""
+        if self._refresh_task is not None or self.is_current():
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._refresh_in_thread())
+        except RuntimeError:
+            # No event loop (CLI / scripts) — build inline
+            self.refresh()
+            return
+        self._refresh_task = task
+
+    async def _refresh_in_thread(self):
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            print(f"⚠ {type(self).__name__} rebuild failed: {e}")
+        finally:
+            self._refresh_task = None
@@ -163,6 +163,7 @@ class ChatbotService:
         product_context: dict,
         session_id: str = None,
         x_api_key: str = None,  # ← ADD THIS
+        include_similar: bool = False,
     ):
         """
         Main chat handler. Detects intent and routes to:
@@ -183,7 +184,7 @@ class ChatbotService:
             )
         
         # Step 3: Fall through to existing product Q&A
-        return await self._handle_product_question(user_query, product_context)
+        return await self._handle_product_question(user_query, product_context, include_similar)
 
     # ============================================================
     # INTENT CLASSIFICATION
@@ -282,6 +283,23 @@ class ChatbotService:
             traceback.print_exc()
             return "I'm having trouble looking up your order right now. Please try again in a moment."
 
+    def _similar_products_info(self, product_context: dict) -> str:
+        """Prompt section listing the product's precomputed similar products."""
+        from services.similar_products import get_similar_products
+
+        match = re.search(r"(\d+)$", str(product_context.get('productId') or ''))
+        if not match:
+            return ""
+        try:
+            similar = get_similar_products(int(match.group(1)), limit=5)
+        except Exception as e:
+            print(f"Similar products lookup failed: {e}")
+            return ""
+        if not similar:
+            return ""
+        lines = [f"- {p['title']} ({p['brand'] or 'N/A'}) — {p['price']}" for p in similar]
+        return "\n### Similar Products:\n" + "\n".join(lines) + "\n"
+
     # ============================================================
     # EXISTING PRODUCT Q&A FLOW (unchanged)
     # ============================================================
@@ -289,6 +307,7 @@ class ChatbotService:
         self,
         user_query: str,
         product_context: dict,
+        include_similar: bool = False,
     ) -> str:
         """Existing product Q&A flow with OpenAI/Gemini fallback"""
         
@@ -313,6 +332,8 @@ Description: {product_description}
 Availability: {'In Stock' if in_stock else 'Out of Stock'}
             """.strip()
 
+            similar_info = self._similar_products_info(product_context) if include_similar else ""
+
             # Create prompt
             prompt = f"""
 You are an AI assistant for an e-commerce website. Your task is to provide clear and relevant answers based on the given product details.
@@ -321,11 +342,13 @@ You are an AI assistant for an e-commerce website. Your task is to provide clear
 1. Answer concisely based only on the product details provided.
 2. If the user asks about orders, cancellations, returns, or tracking, respond that you can help with that and ask for their order number.
 3. Avoid raw data dumps—only provide direct human-readable responses.
+4. If the user asks for alternatives (e.g. something similar or cheaper), suggest from Similar Products when listed.
 
 ---
 
 ### Product Information:
 {product_info}
+{similar_info}
 
 ---
 
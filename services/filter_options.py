@@ -0,0 +1,156 @@
+# services/filter_options.py
+"""
+Derive each category's filter options from the live shopify_products
+attributes instead of the Excel snapshot, so the finder never offers an
+option that matches nothing.
+
+The job is incremental: by default only categories with products synced
+since the last run are recomputed, and a filter is only written when its
+options or counts actually changed.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from models.schemas import (
+    ShopifyProduct,
+    bump_catalog_version,
+    filter,
+    job_checkpoint,
+    product_category,
+    rebuild_category_filters_payload,
+)
+
+JOB_NAME = "filter_options"
+# Filter name whose options come from the product's brand, not attributes
+BRAND_FILTER_NAME = "Brand"
+# Product saves arriving within this window are folded into one run
+SYNC_DEBOUNCE_SEC = 30
+
+_pending_categories: Set = set()
+_pending_task: Optional[asyncio.Task] = None
+
+
+def _option_key(value) -> str:
+    return str(value).strip()
+
+
+def _derive_option_counts(category_ids: list) -> Dict:
+    """category_id → filter name → {option: product count}, from one pass per source."""
+    collection = ShopifyProduct._get_collection()
+    counts: Dict = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+
+    attribute_pipeline = [
+        {"$match": {"category_id": {"$in": category_ids}}},
+        {"$project": {"category_id": 1,
+                      "attrs": {"$objectToArray": {"$ifNull": ["$attributes", {}]}}}},
+        {"$unwind": "$attrs"},
+        # List-valued attributes count once per value; scalars pass through
+        {"$unwind": "$attrs.v"},
+        {"$match": {"attrs.v": {"$nin": [None, ""]}}},
+        {"$group": {"_id": {"category_id": "$category_id", "name": "$attrs.k", "value": "$attrs.v"},
+                    "count": {"$sum": 1}}},
+    ]
+    brand_pipeline = [
+        {"$match": {"category_id": {"$in": category_ids}, "brand": {"$nin": [None, ""]}}},
+        {"$group": {"_id": {"category_id": "$category_id", "value": "$brand"},
+                    "count": {"$sum": 1}}},
+    ]
+    for row in collection.aggregate(attribute_pipeline, allowDiskUse=True):
+        key = row["_id"]
+        value = _option_key(key["value"])
+        if value:
+            counts[key["category_id"]][key["name"]][value] += row["count"]
+    for row in collection.aggregate(brand_pipeline, allowDiskUse=True):
+        key = row["_id"]
+        value = _option_key(key["value"])
+        if value:
+            counts[key["category_id"]][BRAND_FILTER_NAME][value] += row["count"]
+    return counts
+
+
+def _dirty_category_ids(since: Optional[datetime]) -> list:
+    if since is None:
+        return [doc["_id"] for doc in product_category._get_collection().find({}, {"_id": 1})]
+    ids = ShopifyProduct._get_collection().distinct(
+        "category_id", {"last_synced": {"$gte": since}, "category_id": {"$ne": None}}
+    )
+    return [cid for cid in ids if cid is not None]
+
+
+def sync_filter_options(full: bool = False, category_ids: Optional[Iterable] = None) -> dict:
+    """
+    Rewrite filter.config.options / option_counts from live product data.
+
+    Recomputes the given categories, or every category when full=True, or
+    otherwise those with products synced since the previous run. A filter
+    with no matching products keeps its document but gets no options, which
+    hides it from /category_filters.
+    """
+    started = datetime.utcnow()
+    checkpoint = job_checkpoint.objects(id=JOB_NAME).first()
+    if category_ids is not None:
+        targets = list(category_ids)
+    else:
+        targets = _dirty_category_ids(None if full or not checkpoint else checkpoint.last_run)
+
+    updated = 0
+    changed_categories = set()
+    if targets:
+        counts = _derive_option_counts(targets)
+        filter_collection = filter._get_collection()
+        for doc in filter_collection.find({"category_id": {"$in": targets}},
+                                          {"category_id": 1, "name": 1, "config": 1}):
+            derived = counts.get(doc["category_id"], {}).get(doc["name"], {})
+            options = sorted(derived)
+            # List, not a dict — option values like "1.5 Ton" can't be Mongo keys
+            option_counts = [{"value": v, "count": derived[v]} for v in options]
+            config = doc.get("config") or {}
+            if config.get("options") == options and config.get("option_counts") == option_counts:
+                continue
+            # Partial $set keeps display_style and any hand-edited config keys
+            filter_collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"config.options": options, "config.option_counts": option_counts}},
+            )
+            updated += 1
+            changed_categories.add(doc["category_id"])
+
+    for category_id in changed_categories:
+        rebuild_category_filters_payload(category_id)
+    if changed_categories:
+        bump_catalog_version()
+    if category_ids is None:
+        job_checkpoint.objects(id=JOB_NAME).update_one(upsert=True, set__last_run=started)
+
+    print(f"✅ Filter options: {len(targets)} categories checked, {updated} filters updated")
+    return {"categories": len(targets), "updated": updated}
+
+
+async def _run_pending_sync():
+    global _pending_task
+    await asyncio.sleep(SYNC_DEBOUNCE_SEC)
+    category_ids = list(_pending_categories)
+    _pending_categories.clear()
+    _pending_task = None
+    try:
+        await asyncio.to_thread(sync_filter_options, category_ids=category_ids)
+    except Exception as e:
+        print(f"⚠ Filter options sync failed: {e}")
+
+
+def schedule_filter_options_sync(*category_ids):
+    """
+    Queue categories for a filter-options refresh after a product sync.
+    Bursts of saves within SYNC_DEBOUNCE_SEC collapse into one job run.
+    """
+    global _pending_task
+    _pending_categories.update(cid for cid in category_ids if cid is not None)
+    if not _pending_categories or _pending_task is not None:
+        return
+    try:
+        _pending_task = asyncio.get_running_loop().create_task(_run_pending_sync())
+    except RuntimeError:
+        # No event loop (CLI import) — the next scheduled job run covers it
+        pass
@@ -0,0 +1,59 @@
+# services/http_cache.py
+"""
+Conditional-GET support for catalog read endpoints.
+
+ETags are derived from the catalog version counter (bumped on every write
+to products, categories, filters and questions) plus the request path and
+query, so a client or CDN holding a current copy gets a 304 with no DB work
+beyond the version check.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from models.schemas import get_catalog_version
+
+CATALOG_MAX_AGE_SEC = 60
+CATALOG_STALE_WHILE_REVALIDATE_SEC = 300
+
+
+def catalog_etag(request: Request, version_fn=get_catalog_version) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    key = f"{version_fn()}|{request.url.path}?{query}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def _client_has(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def catalog_cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": (
+            f"public, max-age={CATALOG_MAX_AGE_SEC}, "
+            f"stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE_SEC}"
+        ),
+        # Responses are only served to holders of a valid key
+        "Vary": "X-API-KEY",
+    }
+
+
+def check_not_modified(request: Request, response: Response,
+                       version_fn=get_catalog_version) -> Optional[Response]:
+    """
+    Stamp ETag / Cache-Control onto the outgoing response and return a
+    ready 304 when the client's copy is current. Call after verify_api_key.
+    version_fn picks the counter the payload depends on (default: catalog).
+    """
+    etag = catalog_etag(request, version_fn)
+    headers = catalog_cache_headers(etag)
+    response.headers.update(headers)
+    if _client_has(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
@@ -7,11 +7,13 @@ from datetime import datetime, timedelta
 from fastapi import HTTPException
 from typing import Optional
 
-from services.auth import verify_api_key  
+from models.order_schemas import AuthCheckResponse, OrderVerifyResponse
+from services.auth import verify_api_key, check_rate_limit
+from services.shopify_order_adapter import adapter_for_config
 
+# Only needed for the guest verify-token flow — checked on use so the app
+# (and the authenticated order path) still boots without it
 JWT_SECRET = os.getenv("ORDER_VERIFY_JWT_SECRET")
-if not JWT_SECRET:
-    raise RuntimeError("ORDER_VERIFY_JWT_SECRET not set — required for order verify tokens")
 
 VERIFY_TOKEN_TTL_MIN = 10  
 
@@ -61,6 +63,13 @@ async def verify_guest_order(order_number: str, email: Optional[str], phone_last
 
 
 
+def _jwt_secret() -> str:
+    if not JWT_SECRET:
+        print("⚠️ ORDER_VERIFY_JWT_SECRET not set — order verify tokens unavailable")
+        raise HTTPException(status_code=503, detail="Order verification is not configured")
+    return JWT_SECRET
+
+
 def issue_verify_token(order_id: str, customer_id: Optional[str] = None) -> str:
     payload = {
         "order_id": order_id,
@@ -68,15 +77,63 @@ def issue_verify_token(order_id: str, customer_id: Optional[str] = None) -> str:
         "exp": datetime.utcnow() + timedelta(minutes=VERIFY_TOKEN_TTL_MIN),
         "iat": datetime.utcnow(),
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+    return jwt.encode(payload, _jwt_secret(), algorithm="HS256")
 
 
 def validate_verify_token(token: str) -> dict:
     
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = jwt.decode(token, _jwt_secret(), algorithms=["HS256"])
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Order verification expired, please verify again")
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid verification token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid verification token")
+
+
+# ============================================================
+# Service entry points — shared by the /orders routes and the chat
+# order flow (services.order_intent_handler), so neither goes over HTTP
+# ============================================================
+
+async def run_auth_check(x_api_key: str, customer_id: Optional[str], customer_token: Optional[str]) -> AuthCheckResponse:
+    """Authenticated-path: independently confirm a host-supplied customer against the platform."""
+    config = verify_api_key(x_api_key)
+    check_rate_limit(x_api_key, config.get("rate_limit", 100))
+
+    adapter = adapter_for_config(config)
+    verified_id = await verify_customer_token(customer_token, customer_id, adapter)
+    return AuthCheckResponse(
+        authenticated=verified_id is not None,
+        customer_id=verified_id,
+    )
+
+
+async def run_order_verify(x_api_key: str, session_id: str, order_number: str,
+                           email: Optional[str], phone_last4: Optional[str]) -> OrderVerifyResponse:
+    """
+    Guest-path: order_number + email/phone_last4 → order_id + short-lived verify_token.
+    Stricter per-session rate limit than general chat — enumeration guard.
+    """
+    config = verify_api_key(x_api_key)
+    _jwt_secret()  # fail fast with 503 before spending a verify attempt or a Shopify call
+    check_order_verify_rate_limit(x_api_key, session_id)  # separate stricter bucket
+
+    if not email and not phone_last4:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide email or phone (last 4 digits) to verify order ownership",
+        )
+
+    adapter = adapter_for_config(config)
+    order_id = await verify_guest_order(order_number, email, phone_last4, adapter)
+
+    if not order_id:
+        # generic message — never reveal which field mismatched
+        return OrderVerifyResponse(
+            verified=False,
+            message="We couldn't find a matching order. Please double-check your order number and email.",
+        )
+
+    token = issue_verify_token(order_id)
+    return OrderVerifyResponse(verified=True, order_id=order_id, verify_token=token)
@@ -5,12 +5,14 @@ Owns session-state, calls adapter via endpoints, sequences confirm-step
 for mutating actions. Sits between chatbot_service.py and the routes.
 """
 import re
+import asyncio
 from typing import Optional
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 
-from services.shopify_order_adapter import ShopifyOrderAdapter
+from services.shopify_order_adapter import ShopifyOrderAdapter, adapter_for_config
 from services.auth import verify_api_key
+from services.order_auth import run_auth_check, run_order_verify
 
 
 # In-memory session store (MVP) — swap to Redis before multi-instance deploy
@@ -19,11 +21,19 @@ _session_store: dict = {}
 
 SESSION_TTL_MINUTES = 30
 
+# Background order-detail prefetches — held so they aren't garbage-collected mid-flight
+_prefetch_tasks: set = set()
+
+# Naming a listed order: "#1002", "order 1002", "order no. 1002", or a reply that is just the number
+_ORDER_REF_RE = re.compile(r'(?:#|order\s*(?:number|no\.?)?\s*#?\s*|ord[-_]?)(\d{3,10})\b', re.IGNORECASE)
+_BARE_ORDER_NUMBER_RE = re.compile(r'\s*#?(\d{3,10})\s*[.!?]?\s*')
+
 
 def _get_session(session_id: str) -> dict:
     """Load or init session state"""
     if session_id not in _session_store:
         _session_store[session_id] = {
+            "raw_session_id": session_id,  # order-verify rate-limit bucket
             "order_flow_state": "none",  # none | awaiting_verify | verified | awaiting_confirm
             "verify_token": None,
             "verified_order_id": None,
@@ -31,6 +41,7 @@ def _get_session(session_id: str) -> dict:
             "auth_checked": False,
             "verify_attempts": 0,
             "pending_action": None,  # {action: "cancel"|"return", order_id, payload, expires_at}
+            "listed_orders": {},  # order_number → order_id from the last authenticated list
             "last_active": datetime.utcnow(),
         }
     
@@ -66,6 +77,14 @@ async def handle_order_status_query(
     config = verify_api_key(x_api_key)
     adapter = _build_adapter(config)
     
+    # Picking one of the customer's listed orders — details were prefetched.
+    # Checked first so naming another order switches away from a verified one
+    selected_id = _select_listed_order(sess, message)
+    if selected_id:
+        sess["order_flow_state"] = "verified"
+        sess["verified_order_id"] = selected_id
+        return await _fetch_and_format(selected_id, sess, x_api_key, adapter)
+
     # Already verified this session — use cached state
     if sess["order_flow_state"] == "verified" and sess.get("verified_order_id"):
         return await _fetch_and_format(sess["verified_order_id"], sess, x_api_key, adapter)
@@ -73,12 +92,13 @@ async def handle_order_status_query(
     # Authenticated path — try to silently resolve via customer_id
     if not sess["auth_checked"] and product_context.get("customer_id"):
         sess["auth_checked"] = True
-        from services.auth import _call_internal_auth_check  # helper, see below
-        auth_result = await _call_internal_auth_check(
-            product_context["customer_id"], None, x_api_key
-        )
-        if auth_result.get("authenticated"):
-            sess["customer_id"] = auth_result["customer_id"]
+        try:
+            auth_result = await run_auth_check(x_api_key, product_context["customer_id"], None)
+        except HTTPException as e:
+            print(f"⚠️ auth-check failed: {e.detail}")
+            auth_result = None
+        if auth_result and auth_result.authenticated:
+            sess["customer_id"] = auth_result.customer_id
             return await _handle_authenticated_list(sess, adapter, x_api_key)
     
     # Guest path — try to extract order# + email from free text
@@ -230,12 +250,8 @@ async def handle_order_return(
 # ============================================================
 
 def _build_adapter(config: dict) -> ShopifyOrderAdapter:
-    if config.get("platform") != "shopify":
-        raise HTTPException(status_code=501, detail="Platform not yet supported")
-    return ShopifyOrderAdapter(
-        shop_domain=config["shop_domain"],
-        access_token=config["shopify_access_token"],
-    )
+    # Shared per-shop adapter — reuses its pooled connections across turns
+    return adapter_for_config(config)
 
 
 async def _fetch_and_format(order_id: str, sess: dict, x_api_key: str, adapter) -> dict:
@@ -274,6 +290,13 @@ async def _handle_authenticated_list(sess: dict, adapter, x_api_key: str) -> dic
     if not orders:
         return {"reply_text": "I don't see any orders on your account."}
     
+    sess["listed_orders"] = {o.order_number: o.order_id for o in orders}
+    if len(orders) > 1:
+        # Warm the order cache concurrently so whichever one they pick answers instantly
+        task = asyncio.create_task(adapter.prefetch_orders([o.order_id for o in orders]))
+        _prefetch_tasks.add(task)
+        task.add_done_callback(_prefetch_tasks.discard)
+    
     if len(orders) == 1:
         # Single order — auto-select
         order_id = orders[0].order_id
@@ -297,21 +320,36 @@ async def _handle_authenticated_list(sess: dict, adapter, x_api_key: str) -> dic
     }
 
 
+def _select_listed_order(sess: dict, message: str) -> Optional[str]:
+    """order_id of a listed order the message names by number, if any."""
+    listed = sess.get("listed_orders") or {}
+    if not listed:
+        return None
+    bare = _BARE_ORDER_NUMBER_RE.fullmatch(message)
+    numbers = [bare.group(1)] if bare else _ORDER_REF_RE.findall(message)
+    for number in numbers:
+        if number in listed:
+            return listed[number]
+    return None
+
+
 async def _handle_guest_verify(sess: dict, extracted: dict, x_api_key: str, adapter) -> dict:
     return await _try_guest_verify(sess, extracted, x_api_key, adapter)
 
 
 async def _try_guest_verify(sess: dict, extracted: dict, x_api_key: str, adapter) -> dict:
     """Try to verify order ownership for guest path"""
-    from services.auth import _call_internal_verify
-    
-    result = await _call_internal_verify(
-        order_number=extracted["order_number"],
-        email=extracted.get("email"),
-        phone_last4=extracted.get("phone_last4"),
-        session_id=sess.get("raw_session_id", "anonymous"),
-        x_api_key=x_api_key,
-    )
+    try:
+        result = (await run_order_verify(
+            x_api_key,
+            sess.get("raw_session_id", "anonymous"),
+            extracted["order_number"],
+            extracted.get("email"),
+            extracted.get("phone_last4"),
+        )).dict()
+    except HTTPException as e:
+        # Rate-limited / bad input — surface the safe detail as the reply
+        result = {"verified": False, "message": e.detail}
     
     if result.get("verified"):
         sess["order_flow_state"] = "verified"
@@ -0,0 +1,143 @@
+# services/order_mirror.py
+"""
+Local Mongo mirror of normalized Shopify orders.
+
+Order webhooks (orders/create, orders/updated, ...) upsert an order's
+OrderContext here, so order-status chat is an indexed local read instead
+of a rate-limited Admin API call. Only webhook-fed orders are mirrored —
+older orders keep going live until their next webhook.
+
+An entry is served while mirrored_at is within ORDER_MIRROR_MAX_AGE_SEC.
+Fulfillment webhooks and our own cancel/return calls clear mirrored_at and
+record stale_at, so the next read goes live and refreshes it
+(refresh_mirrored_order). Only data observed after stale_at may clear the
+mark — a live read that started before it can't resurrect the old state.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from models.order_schemas import OrderContext
+from models.schemas import order_mirror
+
+# Webhooks keep entries current; this only bounds how long a missed
+# webhook can leave one wrong
+ORDER_MIRROR_MAX_AGE_SEC = 6 * 3600
+
+
+def _mirror_id(shop_domain: str, order_id) -> str:
+    return f"{shop_domain}:{order_id}"
+
+
+def hash_email(email: Optional[str]) -> Optional[str]:
+    if not email or not email.strip():
+        return None
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def mirror_order(shop_domain: str, context: OrderContext, customer_id: Optional[str],
+                 email: Optional[str], phone: Optional[str],
+                 as_of: Optional[datetime] = None) -> bool:
+    """
+    Upsert one order's mirror entry. as_of is when the data was observed
+    (UTC; defaults to the order's updated_at). A payload older than the
+    stored one (webhooks can arrive out of order), or observed before the
+    entry was marked stale, is ignored. Returns True if written.
+    """
+    collection = order_mirror._get_collection()
+    doc_id = _mirror_id(shop_domain, context.order_id)
+    updated_at = _utc_naive(context.updated_at)
+    as_of = _utc_naive(as_of) or updated_at or datetime.utcnow()
+    guards = [{"$or": [{"stale_at": None}, {"stale_at": {"$lte": as_of}}]}]
+    if updated_at is not None:
+        guards.append({"$or": [{"order_updated_at": None}, {"order_updated_at": {"$lte": updated_at}}]})
+    query = {"_id": doc_id, "$and": guards}
+    phone_digits = "".join(ch for ch in (phone or "") if ch.isdigit())
+    try:
+        collection.update_one(query, {"$set": {
+            "shop_domain": shop_domain,
+            "order_id": context.order_id,
+            "order_number": context.order_number,
+            "customer_id": customer_id,
+            "email_hash": hash_email(email),
+            "phone_last4": phone_digits[-4:] or None,
+            "context": context.model_dump(mode="json"),
+            "order_updated_at": updated_at,
+            "mirrored_at": datetime.utcnow(),
+            "stale_at": None,
+        }}, upsert=True)
+    except DuplicateKeyError:
+        if not collection.count_documents({"_id": doc_id}, limit=1):
+            # Not our _id — the (shop_domain, order_number) unique index
+            print(f"⚠️ order mirror: order number {context.order_number!r} on {shop_domain} is "
+                  f"already mirrored for another order — order {context.order_id} not mirrored")
+        # Otherwise a guard on the existing entry failed (newer updated_at or
+        # stale mark), so the upsert tried to insert
+        return False
+    return True
+
+
+def refresh_mirrored_order(shop_domain: str, context: OrderContext, customer_id: Optional[str],
+                           email: Optional[str], phone: Optional[str], fetch_started: datetime) -> None:
+    """
+    After a live read that began at fetch_started (UTC): bring an existing
+    entry up to date. Never creates one.
+    """
+    if order_mirror._get_collection().count_documents(
+            {"_id": _mirror_id(shop_domain, context.order_id)}, limit=1):
+        mirror_order(shop_domain, context, customer_id, email, phone, as_of=fetch_started)
+
+
+def mark_order_stale(shop_domain: str, order_id) -> None:
+    order_mirror._get_collection().update_one(
+        {"_id": _mirror_id(shop_domain, order_id)},
+        {"$set": {"mirrored_at": None, "stale_at": datetime.utcnow()}},
+    )
+
+
+def delete_mirrored_order(shop_domain: str, order_id) -> None:
+    order_mirror._get_collection().delete_one({"_id": _mirror_id(shop_domain, order_id)})
+
+
+def _fresh_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=ORDER_MIRROR_MAX_AGE_SEC)
+
+
+def get_mirrored_order(shop_domain: str, order_id) -> Optional[Tuple[OrderContext, Optional[str]]]:
+    """(OrderContext, owning customer id) if the order is mirrored and fresh."""
+    doc = order_mirror._get_collection().find_one(
+        {"_id": _mirror_id(shop_domain, order_id), "mirrored_at": {"$gte": _fresh_cutoff()}},
+        {"context": 1, "customer_id": 1},
+    )
+    if doc is None:
+        return None
+    return OrderContext.model_validate(doc["context"]), doc.get("customer_id")
+
+
+def match_mirrored_order(shop_domain: str, order_number: str, email: Optional[str],
+                         phone_last4: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Guest-path match against the mirror: (found, order_id). found=False
+    means the mirror can't answer (not mirrored or stale) — go live.
+    order_id is None when the order is mirrored but the identity didn't match.
+    """
+    doc = order_mirror._get_collection().find_one(
+        {"shop_domain": shop_domain, "order_number": order_number.lstrip("#"),
+         "mirrored_at": {"$gte": _fresh_cutoff()}},
+        {"order_id": 1, "email_hash": 1, "phone_last4": 1},
+    )
+    if doc is None:
+        return False, None
+    if email and doc.get("email_hash") and hash_email(email) == doc["email_hash"]:
+        return True, doc["order_id"]
+    if phone_last4 and doc.get("phone_last4") == phone_last4:
+        return True, doc["order_id"]
+    return True, None
@@ -0,0 +1,181 @@
+# services/product_bitmap_index.py
+"""
+Columnar in-memory snapshot of shopify_products for finder filtering.
+
+Each (field, value) pair — category, brand, attributes.<Name> — is a NumPy
+boolean column over product rows, so any combination of finder filters
+resolves with bitwise OR (within a field) and AND (across fields). Mongo
+is then only asked for the matching _ids.
+
+The snapshot is only trusted at the catalog version it was built at —
+until a rebuild catches up, resolve() returns None and the finder uses
+its Mongo $match.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from services.catalog_snapshot import CatalogSnapshot
+
+INITIAL_CAPACITY = 1024
+
+def _value_key(value) -> str:
+    return str(value).strip()
+
+
+def _row_pairs(doc: dict) -> List[tuple]:
+    """(field, value) pairs a product row sets a bit for."""
+    pairs = []
+    if doc.get("category_id"):
+        pairs.append(("category_id", _value_key(doc["category_id"])))
+    if doc.get("brand"):
+        pairs.append(("brand", _value_key(doc["brand"])))
+    for name, value in (doc.get("attributes") or {}).items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            if v not in (None, ""):
+                pairs.append((f"attributes.{name}", _value_key(v)))
+    return pairs
+
+
+def _is_indexed_field(field: str) -> bool:
+    return field in ("category_id", "brand") or field.startswith("attributes.")
+
+
+class ProductBitmapIndex(CatalogSnapshot):
+    """
+    Bitmap columns keyed by (field, value). Rows are append-only; an upsert
+    rewrites the product's row in place, a removal clears its alive bit.
+    """
+
+    INDEX_PROJECTION = {"category_id": 1, "brand": 1, "attributes": 1}
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        super().__init__()
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self._size = 0
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._columns: Dict[str, Dict[str, np.ndarray]] = defaultdict(dict)
+        self._row_of: Dict[int, int] = {}
+        self._pairs_of_row: Dict[int, List[tuple]] = {}
+
+    # ------------------------------------------------------------
+    # Build / maintain
+    # ------------------------------------------------------------
+    def _load(self, docs: Iterable[dict]) -> int:
+        for doc in docs:
+            self._upsert_row(doc)
+        return len(self._row_of)
+
+    def _summary(self) -> str:
+        columns = sum(len(values) for values in self._columns.values())
+        return f"🧮 Product bitmap index built: {len(self._row_of)} products, {columns} columns"
+
+    def upsert(self, doc: dict, version: Optional[int] = None):
+        """
+        Re-index one product (raw Mongo doc or ShopifyProduct.to_dict()).
+        version is the catalog version the write produced, if known.
+        """
+        if not self._built:
+            return
+        with self._lock:
+            self._upsert_row(doc)
+            self._advance_version(version)
+
+    def remove(self, product_id: int, version: Optional[int] = None):
+        with self._lock:
+            row = self._row_of.get(product_id)
+            if row is not None:
+                self._clear_row(row)
+                self._alive[row] = False
+            self._advance_version(version)
+
+    def _grow(self):
+        """Double row capacity — every column is padded with False rows."""
+        extra = len(self._ids)
+        self._ids = np.concatenate([self._ids, np.zeros(extra, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for values in self._columns.values():
+            for key, column in values.items():
+                values[key] = np.concatenate([column, np.zeros(extra, dtype=bool)])
+
+    def _clear_row(self, row: int):
+        for field, key in self._pairs_of_row.pop(row, []):
+            column = self._columns[field].get(key)
+            if column is not None:
+                column[row] = False
+
+    def _upsert_row(self, doc: dict):
+        pid = int(doc["_id"])
+        row = self._row_of.get(pid)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._row_of[pid] = row
+            self._ids[row] = pid
+        else:
+            self._clear_row(row)
+
+        pairs = _row_pairs(doc)
+        for field, key in pairs:
+            column = self._columns[field].get(key)
+            if column is None:
+                column = np.zeros(len(self._ids), dtype=bool)
+                self._columns[field][key] = column
+            column[row] = True
+        self._pairs_of_row[row] = pairs
+        self._alive[row] = True
+
+    # ------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------
+    def _field_mask(self, field: str, values: list) -> np.ndarray:
+        size = self._size
+        if field == "_id":
+            return np.isin(self._ids[:size], np.asarray(values, dtype=np.int64))
+        mask = np.zeros(size, dtype=bool)
+        columns = self._columns.get(field, {})
+        for value in values:
+            column = columns.get(_value_key(value))
+            if column is not None:
+                mask |= column[:size]
+        return mask
+
+    def resolve(self, match: Dict[str, object]) -> Optional[List[int]]:
+        """
+        Product _ids matching a finder $match (equality / $in on category_id,
+        brand, attributes.<Name> and _id). Returns None for any condition the
+        snapshot can't answer, or while it is missing or behind the catalog
+        version, so the caller falls back to Mongo.
+        """
+        if not self.is_current():
+            self.schedule_refresh()
+            return None
+        conditions = []
+        for field, condition in match.items():
+            if field != "_id" and not _is_indexed_field(field):
+                return None
+            if isinstance(condition, dict):
+                if set(condition) != {"$in"}:
+                    return None
+                values = list(condition["$in"])
+            else:
+                values = [condition]
+            conditions.append((field, values))
+
+        with self._lock:
+            mask = self._alive[:self._size].copy()
+            for field, values in conditions:
+                mask &= self._field_mask(field, values)
+                if not mask.any():
+                    return []
+            return self._ids[:self._size][mask].tolist()
+
+
+product_bitmap_index = ProductBitmapIndex()
@@ -0,0 +1,251 @@
+# services/product_search.py
+"""
+In-process inverted index over shopify_products for the product finder.
+
+Indexes title/brand/type/tag/attribute tokens, their prefixes and SKU
+character n-grams, and keeps a catalog-built dictionary for spell
+correction of misspelled query terms. Answers are ranked product _ids
+that the /products endpoint feeds into its $match.
+
+Rebuilt off the event loop whenever the catalog version moves (see
+services.catalog_snapshot); a slightly stale index keeps answering until
+the rebuild lands.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from spellchecker import SpellChecker
+
+from services.catalog_snapshot import CatalogSnapshot
+
+MIN_PREFIX_LEN = 2
+SKU_NGRAM = 3
+MAX_CACHED_CORRECTIONS = 10000
+# Spell correction runs on the event loop under the index lock — one edit
+# keeps a lookup to ~54·len candidates (distance 2 is quadratic in that),
+# and longer terms are model numbers or noise rather than typos
+SPELL_DISTANCE = 1
+MAX_CORRECTION_LEN = 15
+
+# Per-hit weights — exact beats corrected beats prefix beats SKU n-gram
+WEIGHT_EXACT = 3.0
+WEIGHT_CORRECTED = 2.0
+WEIGHT_PREFIX = 1.5
+WEIGHT_SKU = 1.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _normalize_sku(sku: Optional[str]) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(sku or "").lower())
+
+
+def _sku_ngrams(sku: str) -> Set[str]:
+    if len(sku) <= SKU_NGRAM:
+        return {sku} if sku else set()
+    return {sku[i:i + SKU_NGRAM] for i in range(len(sku) - SKU_NGRAM + 1)}
+
+
+def _product_skus(doc: dict) -> Set[str]:
+    skus = {_normalize_sku(doc.get("sku"))}
+    for v in doc.get("variants") or []:
+        skus.add(_normalize_sku((v or {}).get("sku")))
+    skus.discard("")
+    return skus
+
+
+def _product_tokens(doc: dict) -> Set[str]:
+    tokens: Set[str] = set()
+    for key in ("title", "brand", "vendor", "product_type"):
+        tokens.update(tokenize(doc.get(key)))
+    for tag in doc.get("tags") or []:
+        tokens.update(tokenize(tag))
+    for value in (doc.get("attributes") or {}).values():
+        tokens.update(tokenize(value))
+    return tokens
+
+
+class ProductSearchIndex(CatalogSnapshot):
+    """
+    Token / prefix / SKU n-gram postings keyed by ShopifyProduct._id.
+    Built at startup, rebuilt on catalog version changes, and patched
+    in-process via upsert() in between.
+    """
+
+    INDEX_PROJECTION = {
+        "title": 1,
+        "brand": 1,
+        "vendor": 1,
+        "product_type": 1,
+        "tags": 1,
+        "attributes": 1,
+        "sku": 1,
+        "variants.sku": 1,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._prefixes: Dict[str, Set[int]] = defaultdict(set)
+        self._sku_grams: Dict[str, Set[int]] = defaultdict(set)
+        self._skus: Dict[str, Set[int]] = defaultdict(set)
+        # Reverse map so an upsert can pull the product's old postings
+        self._doc_terms: Dict[int, dict] = {}
+        self._spell = SpellChecker(language=None, distance=SPELL_DISTANCE)
+        # Query-term → correction memo; cleared whenever the dictionary grows
+        self._corrections: Dict[str, Optional[str]] = {}
+
+    # ------------------------------------------------------------
+    # Build / maintain
+    # ------------------------------------------------------------
+    def _load(self, docs: Iterable[dict]) -> int:
+        vocabulary: List[str] = []
+        for doc in docs:
+            vocabulary.extend(self._add(doc))
+        self._spell.word_frequency.load_words(vocabulary)
+        return len(self._doc_terms)
+
+    def _summary(self) -> str:
+        return f"🔎 Product search index built: {len(self._doc_terms)} products, {len(self._tokens)} terms"
+
+    def upsert(self, doc: dict, version: Optional[int] = None):
+        """
+        Re-index one product (raw Mongo doc or ShopifyProduct.to_dict()).
+        version is the catalog version the write produced, if known.
+        """
+        if not self._built:
+            # The pending full build will pick this product up anyway
+            return
+        with self._lock:
+            self._remove(doc["_id"])
+            new_words = self._add(doc)
+            if new_words:
+                self._spell.word_frequency.load_words(new_words)
+                self._corrections = {}
+            self._advance_version(version)
+
+    def remove(self, product_id: int, version: Optional[int] = None):
+        with self._lock:
+            self._remove(product_id)
+            self._advance_version(version)
+
+    def _add(self, doc: dict) -> List[str]:
+        pid = doc["_id"]
+        tokens = _product_tokens(doc)
+        skus = _product_skus(doc)
+        prefixes = {t[:i] for t in tokens for i in range(MIN_PREFIX_LEN, len(t))}
+        grams = set().union(*(_sku_ngrams(s) for s in skus)) if skus else set()
+
+        for t in tokens:
+            self._tokens[t].add(pid)
+        for p in prefixes:
+            self._prefixes[p].add(pid)
+        for s in skus:
+            self._skus[s].add(pid)
+        for g in grams:
+            self._sku_grams[g].add(pid)
+
+        self._doc_terms[pid] = {
+            "tokens": tokens, "prefixes": prefixes, "skus": skus, "grams": grams,
+        }
+        # Only alphabetic words go in the spelling dictionary — model numbers
+        # are matched through SKU n-grams instead
+        return [t for t in tokens if t.isalpha() and len(t) > 2]
+
+    def _remove(self, pid: int):
+        terms = self._doc_terms.pop(pid, None)
+        if not terms:
+            return
+        for postings, keys in (
+            (self._tokens, terms["tokens"]),
+            (self._prefixes, terms["prefixes"]),
+            (self._skus, terms["skus"]),
+            (self._sku_grams, terms["grams"]),
+        ):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is None:
+                    continue
+                ids.discard(pid)
+                if not ids:
+                    del postings[key]
+
+    # ------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------
+    def _correct(self, term: str) -> Optional[str]:
+        if not term.isalpha() or not 3 < len(term) <= MAX_CORRECTION_LEN:
+            return None
+        if term not in self._corrections:
+            if len(self._corrections) >= MAX_CACHED_CORRECTIONS:
+                self._corrections.clear()
+            self._corrections[term] = self._spell.correction(term)
+        corrected = self._corrections[term]
+        if corrected and corrected != term and corrected in self._tokens:
+            return corrected
+        return None
+
+    def _score_term(self, term: str, scores: Dict[int, float]) -> Set[int]:
+        hits: Dict[int, float] = {}
+
+        def _hit(ids, weight):
+            for pid in ids:
+                if weight > hits.get(pid, 0):
+                    hits[pid] = weight
+
+        _hit(self._tokens.get(term, ()), WEIGHT_EXACT)
+        _hit(self._skus.get(_normalize_sku(term), ()), WEIGHT_EXACT)
+        _hit(self._prefixes.get(term, ()), WEIGHT_PREFIX)
+
+        sku_term = _normalize_sku(term)
+        if len(sku_term) >= SKU_NGRAM and any(c.isdigit() for c in sku_term):
+            grams = _sku_ngrams(sku_term)
+            candidates = None
+            for g in grams:
+                ids = self._sku_grams.get(g, set())
+                candidates = ids.copy() if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            _hit(candidates or (), WEIGHT_SKU)
+
+        if not hits:
+            corrected = self._correct(term)
+            if corrected:
+                _hit(self._tokens.get(corrected, ()), WEIGHT_CORRECTED)
+
+        for pid, weight in hits.items():
+            scores[pid] = scores.get(pid, 0) + weight
+        return set(hits)
+
+    def search(self, query: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Ranked ShopifyProduct _ids for a free-text query. Products matching
+        more query terms rank first, then by summed term weight. None until
+        the first build has finished — the caller falls back to Mongo.
+        """
+        self.schedule_refresh()
+        if not self._built:
+            return None
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = defaultdict(int)
+        with self._lock:
+            for term in dict.fromkeys(terms):
+                for pid in self._score_term(term, scores):
+                    matched[pid] += 1
+
+        ranked = sorted(scores, key=lambda pid: (-matched[pid], -scores[pid], pid))
+        return ranked[:limit] if limit else ranked
+
+
+product_search_index = ProductSearchIndex()
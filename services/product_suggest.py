@@ -0,0 +1,187 @@
+# services/product_suggest.py
+"""
+Sorted-array prefix index over shopify_products for search-box typeahead.
+
+Every product contributes phrases — its title (and each later word of the
+title, so "qled" finds "Samsung 55 QLED"), brand, category name and SKUs.
+Phrases are kept in one sorted list, so a prefix lookup is a bisect plus a
+short forward scan instead of a regex over the collection.
+
+Rebuilt off the event loop whenever the catalog version moves (see
+services.catalog_snapshot). Until the first build lands, lookups fall back
+to an anchored title regex.
+"""
+import bisect
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.schemas import ShopifyProduct
+from services.catalog_snapshot import CatalogSnapshot
+
+DEFAULT_LIMIT = 8
+# Forward-scan cap per lookup; ranking only looks at this many candidates
+MAX_SCAN = 400
+
+# Lower sorts first when relevance ties
+KIND_PRIORITY = {"brand": 0, "category": 1, "product": 2, "sku": 3}
+
+_SPACE_RE = re.compile(r"\s+")
+
+# (normalized phrase, kind, display text, target id)
+Entry = Tuple[str, str, str, str]
+
+
+def normalize(text: Optional[str]) -> str:
+    return _SPACE_RE.sub(" ", str(text or "").lower()).strip()
+
+
+def _product_entries(doc: dict) -> Set[Entry]:
+    pid = str(doc["_id"])
+    entries: Set[Entry] = set()
+    title = (doc.get("title") or "").strip()
+    if title:
+        words = normalize(title).split(" ")
+        for i in range(len(words)):
+            entries.add((" ".join(words[i:]), "product", title, pid))
+    brand = (doc.get("brand") or "").strip()
+    if brand:
+        entries.add((normalize(brand), "brand", brand, brand))
+    category_name = (doc.get("category_name") or "").strip()
+    if category_name and doc.get("category_id"):
+        entries.add((normalize(category_name), "category", category_name, str(doc["category_id"])))
+    skus = {doc.get("sku")} | {(v or {}).get("sku") for v in doc.get("variants") or []}
+    for sku in skus:
+        if sku and str(sku).strip():
+            entries.add((normalize(sku), "sku", str(sku).strip(), pid))
+    return entries
+
+
+class ProductSuggestIndex(CatalogSnapshot):
+    """
+    Phrase entries in a sorted list, each with the set of products that
+    produced it (so shared brands/categories survive one product's removal
+    and rank by product count). Patched in-process via upsert()/remove()
+    between version-driven rebuilds.
+    """
+
+    INDEX_PROJECTION = {
+        "title": 1,
+        "brand": 1,
+        "category_id": 1,
+        "category_name": 1,
+        "sku": 1,
+        "variants.sku": 1,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self._sorted: List[Entry] = []
+        self._products_of: Dict[Entry, Set[int]] = defaultdict(set)
+        self._entries_of: Dict[int, Set[Entry]] = {}
+
+    # ------------------------------------------------------------
+    # Build / maintain
+    # ------------------------------------------------------------
+    def _load(self, docs: Iterable[dict]) -> int:
+        for doc in docs:
+            pid = doc["_id"]
+            entries = _product_entries(doc)
+            self._entries_of[pid] = entries
+            for entry in entries:
+                self._products_of[entry].add(pid)
+        self._sorted = sorted(self._products_of)
+        return len(self._entries_of)
+
+    def _summary(self) -> str:
+        return f"💡 Product suggest index built: {len(self._entries_of)} products, {len(self._sorted)} phrases"
+
+    def upsert(self, doc: dict, version: Optional[int] = None):
+        """
+        Re-index one product (raw Mongo doc or ShopifyProduct.to_dict()).
+        version is the catalog version the write produced, if known.
+        """
+        if not self._built:
+            return
+        with self._lock:
+            self._remove(doc["_id"])
+            entries = _product_entries(doc)
+            self._entries_of[doc["_id"]] = entries
+            for entry in entries:
+                if not self._products_of[entry]:
+                    bisect.insort(self._sorted, entry)
+                self._products_of[entry].add(doc["_id"])
+            self._advance_version(version)
+
+    def remove(self, product_id: int, version: Optional[int] = None):
+        with self._lock:
+            self._remove(product_id)
+            self._advance_version(version)
+
+    def _remove(self, pid: int):
+        for entry in self._entries_of.pop(pid, ()):
+            products = self._products_of.get(entry)
+            if products is None:
+                continue
+            products.discard(pid)
+            if not products:
+                del self._products_of[entry]
+                i = bisect.bisect_left(self._sorted, entry)
+                if i < len(self._sorted) and self._sorted[i] == entry:
+                    del self._sorted[i]
+
+    # ------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        """
+        Top suggestions whose phrase starts with prefix. Whole-phrase starts
+        (e.g. a title's first word) beat mid-title matches, then brands and
+        categories beat products, then more products beat fewer.
+        """
+        self.schedule_refresh()
+        needle = normalize(prefix)
+        if not needle:
+            return []
+        if not self._built:
+            return _fallback_suggest(needle, limit)
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, (needle,))
+            candidates: Dict[tuple, tuple] = {}
+            for entry in self._sorted[start:start + MAX_SCAN]:
+                phrase, kind, display, target = entry
+                if not phrase.startswith(needle):
+                    break
+                key = (kind, target)
+                rank = (
+                    normalize(display) != phrase,  # matched mid-title
+                    KIND_PRIORITY[kind],
+                    -len(self._products_of[entry]),
+                    len(display),
+                    display,
+                )
+                if key not in candidates or rank < candidates[key][0]:
+                    candidates[key] = (rank, entry)
+        ranked = sorted(candidates.values())[:limit]
+        suggestions = []
+        for rank, (phrase, kind, display, target) in ranked:
+            suggestion = {"type": kind, "text": display}
+            if kind in ("product", "sku"):
+                suggestion["product_id"] = int(target)
+            else:
+                suggestion["count"] = -rank[2]
+                if kind == "category":
+                    suggestion["category_id"] = target
+            suggestions.append(suggestion)
+        return suggestions
+
+
+def _fallback_suggest(needle: str, limit: int) -> List[dict]:
+    """Product-title suggestions straight from Mongo, used before the first build."""
+    cursor = ShopifyProduct._get_collection().find(
+        {"title": {"$regex": "^" + re.escape(needle), "$options": "i"}}, {"title": 1}
+    ).limit(limit)
+    return [{"type": "product", "text": doc["title"], "product_id": int(doc["_id"])} for doc in cursor]
+
+
+product_suggest_index = ProductSuggestIndex()
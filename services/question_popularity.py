@@ -0,0 +1,70 @@
+# services/question_popularity.py
+"""
+Per-question popularity counters fed by /chat FAQ hits.
+
+Hits are tallied in memory and flushed as one bulk $inc every
+FLUSH_INTERVAL_SEC (or on shutdown), so a busy chat doesn't turn into one
+Mongo write per message. A flush that writes anything bumps the questions
+version (not the catalog version), so every worker's cached /questions
+ranking and its ETag move on without churning the other catalog caches.
+"""
+import asyncio
+import threading
+from collections import Counter
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from models.schemas import bump_questions_version, product_questions
+
+FLUSH_INTERVAL_SEC = 60
+
+_pending: Counter = Counter()  # (category_id, question_id) → hits
+_pending_lock = threading.Lock()
+_flush_task: Optional[asyncio.Task] = None
+
+
+def record_question_hit(category_id, question_id):
+    """Count one FAQ answer served from the DB; written on the next flush."""
+    global _flush_task
+    with _pending_lock:
+        _pending[(str(category_id), str(question_id))] += 1
+    if _flush_task is not None:
+        return
+    try:
+        _flush_task = asyncio.get_running_loop().create_task(_flush_later())
+    except RuntimeError:
+        # No event loop — flushed by the next flush_question_hits() call
+        pass
+
+
+def flush_question_hits() -> int:
+    """Write pending hit counts in one bulk $inc. Returns questions updated."""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+    ops = [
+        UpdateOne({"_id": ObjectId(question_id)}, {"$inc": {"popularity": hits}})
+        for (_, question_id), hits in pending.items()
+    ]
+    try:
+        product_questions._get_collection().bulk_write(ops, ordered=False)
+    except Exception as e:
+        # Put the counts back so the next flush retries them
+        with _pending_lock:
+            _pending.update(pending)
+        print(f"⚠ Question popularity flush failed: {e}")
+        return 0
+    # Once per flush, not per hit — rankings reach other workers and cached clients
+    bump_questions_version()
+    return len(ops)
+
+
+async def _flush_later():
+    global _flush_task
+    await asyncio.sleep(FLUSH_INTERVAL_SEC)
+    _flush_task = None
+    await asyncio.to_thread(flush_question_hits)
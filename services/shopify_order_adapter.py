@@ -1,9 +1,20 @@
 # services/shopify_order_adapter.py
 import os
+import asyncio
 import httpx
-from typing import Optional, List
+from fastapi import HTTPException
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 
+from services.cache import TTLCache
+from services.order_mirror import (
+    delete_mirrored_order,
+    get_mirrored_order,
+    mark_order_stale,
+    match_mirrored_order,
+    mirror_order,
+    refresh_mirrored_order,
+)
 from models.order_schemas import (
     OrderContext, OrderLineItem, TrackingInfo, MaskedCustomer,
     OrderStatus, OrderListItem
@@ -11,6 +22,29 @@ from models.order_schemas import (
 
 SHOPIFY_API_VERSION = "2024-10"  # pin explicit — bump deliberately, don't let it drift silent
 
+# One pooled client per shop — order lookups make several calls back to back
+SHOPIFY_HTTP_TIMEOUT_SEC = 10
+SHOPIFY_CANCEL_TIMEOUT_SEC = 15
+# A replaced adapter's client stays open this long so requests already in
+# flight on it can finish — none outlives the longest request timeout
+ADAPTER_CLOSE_GRACE_SEC = max(SHOPIFY_HTTP_TIMEOUT_SEC, SHOPIFY_CANCEL_TIMEOUT_SEC)
+SHOPIFY_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+# Raw Shopify order snapshots keyed by (shop_domain, order_id). Short TTL —
+# a chat turn or status poll re-reads the same order within seconds.
+# Dropped on cancel/return and by order webhooks (invalidate_order_snapshot).
+ORDER_SNAPSHOT_TTL_SEC = 30
+# Parallel detail fetches per prefetch — stays well inside Shopify's REST call bucket
+ORDER_PREFETCH_CONCURRENCY = 3
+# Prefetched snapshots must outlive a human picking from the list; mutations
+# and order webhooks still drop them early
+ORDER_PREFETCH_TTL_SEC = 300
+order_snapshot_cache = TTLCache(ttl_seconds=ORDER_SNAPSHOT_TTL_SEC, maxsize=2048)
+
+
+def invalidate_order_snapshot(shop_domain: str, order_id) -> None:
+    order_snapshot_cache.invalidate((shop_domain, str(order_id)))
+
 
 def _mask_email(email: Optional[str]) -> Optional[str]:
     if not email or "@" not in email:
@@ -54,6 +88,17 @@ def _map_shopify_status(order: dict) -> OrderStatus:
     return OrderStatus.placed
 
 
+def _order_owner_id(order: dict) -> Optional[str]:
+    customer_id = (order.get("customer") or {}).get("id")
+    return str(customer_id) if customer_id else None
+
+
+def _mirror_identity(order: dict) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(owner customer id, email, phone) as the mirror stores them — same sources as match_order."""
+    customer = order.get("customer") or {}
+    return _order_owner_id(order), order.get("email"), order.get("phone") or customer.get("phone")
+
+
 def _normalize_order(order: dict) -> OrderContext:
     line_items = []
     for li in order.get("line_items", []):
@@ -105,6 +150,20 @@ class ShopifyOrderAdapter:
         self.shop_domain = shop_domain
         self.access_token = access_token
         self.base_url = f"https://{shop_domain}/admin/api/{SHOPIFY_API_VERSION}"
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        """Long-lived keep-alive client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=SHOPIFY_HTTP_TIMEOUT_SEC, limits=SHOPIFY_HTTP_LIMITS
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     def _headers(self):
         return {
@@ -119,13 +178,16 @@ class ShopifyOrderAdapter:
         Never returns order data itself here — only the id, on match.
         """
         clean_number = order_number.lstrip("#")
+        found, order_id = match_mirrored_order(self.shop_domain, clean_number, email, phone_last4)
+        if found:
+            return order_id
         url = f"{self.base_url}/orders.json"
         params = {"name": f"#{clean_number}", "status": "any"}
 
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers=self._headers(), params=params)
-            resp.raise_for_status()
-            orders = resp.json().get("orders", [])
+        client = self._http()
+        resp = await client.get(url, headers=self._headers(), params=params)
+        resp.raise_for_status()
+        orders = resp.json().get("orders", [])
 
         if not orders:
             return None
@@ -140,53 +202,78 @@ class ShopifyOrderAdapter:
             return str(order["id"])
 
         return None  # found order but identity didn't match — treat as not-found to caller
+
+    async def _fetch_order(self, order_id: str, ttl_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Raw Shopify order, from the snapshot cache when fresh. None on 404.
+        ttl_seconds overrides ORDER_SNAPSHOT_TTL_SEC for a freshly fetched order.
+        """
+        key = (self.shop_domain, str(order_id))
+        order = order_snapshot_cache.get(key)
+        if order is not None:
+            return order
+        url = f"{self.base_url}/orders/{order_id}.json"
+        client = self._http()
+        fetch_started = datetime.utcnow()
+        resp = await client.get(url, headers=self._headers())
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        order = resp.json().get("order")
+        if order:
+            order_snapshot_cache.set(key, order, ttl_seconds)
+            try:
+                refresh_mirrored_order(self.shop_domain, _normalize_order(order), *_mirror_identity(order),
+                                       fetch_started=fetch_started)
+            except Exception as e:
+                print(f"⚠️ order mirror refresh failed: {e}")
+        return order
+
     async def order_belongs_to_customer(self, order_id: str, customer_id: str) -> bool:
         """
         Real ownership check for authenticated-path. Fetches order,
         confirms its customer.id matches the verified customer_id.
         Never skip this — customer_id alone from client is not proof.
         """
-        url = f"{self.base_url}/orders/{order_id}.json"
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers=self._headers())
-            if resp.status_code == 404:
-                return False
-            resp.raise_for_status()
-            order = resp.json().get("order")
+        _, owner_id = await self.get_order_with_owner(order_id)
+        return owner_id is not None and owner_id == str(customer_id)
 
+    async def get_order_with_owner(self, order_id: str) -> Tuple[Optional[OrderContext], Optional[str]]:
+        """
+        One fetch for customer-path requests: the normalized order plus the
+        id of the customer who owns it — (None, None) if the order is missing.
+        Served from the webhook-fed order mirror when fresh.
+        """
+        mirrored = get_mirrored_order(self.shop_domain, order_id)
+        if mirrored is not None:
+            return mirrored
+        order = await self._fetch_order(order_id)
         if not order:
-            return False
-        order_customer = order.get("customer") or {}
-        return str(order_customer.get("id", "")) == str(customer_id)
-    async def get_order(self, order_id: str) -> Optional[OrderContext]:
-        url = f"{self.base_url}/orders/{order_id}.json"
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers=self._headers())
-            if resp.status_code == 404:
-                return None
-            resp.raise_for_status()
-            order = resp.json().get("order")
+            return None, None
+        return _normalize_order(order), _order_owner_id(order)
 
-        if not order:
-            return None
-        return _normalize_order(order)
-    # Add to services/shopify_order_adapter.py (inside ShopifyOrderAdapter class)
+    async def get_order(self, order_id: str) -> Optional[OrderContext]:
+        order, _ = await self.get_order_with_owner(order_id)
+        return order
 
-async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dict:
-    """
-    Cancel a Shopify order. 
-    Shopify-side: POST /admin/orders/{id}/cancel.json
-    Returns dict with success flag + new order data, OR raises with structured error.
-    """
-    url = f"{self.base_url}/orders/{order_id}/cancel.json"
-    payload = {}
-    if reason:
-        payload["reason"] = reason
-    payload["email"] = True  # notify customer
-    payload["refund"] = True  # auto-refund if paid
+    async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dict:
+        """
+        Cancel a Shopify order. 
+        Shopify-side: POST /admin/orders/{id}/cancel.json
+        Returns dict with success flag + new order data, OR raises with structured error.
+        """
+        url = f"{self.base_url}/orders/{order_id}/cancel.json"
+        payload = {}
+        if reason:
+            payload["reason"] = reason
+        payload["email"] = True  # notify customer
+        payload["refund"] = True  # auto-refund if paid
     
-    async with httpx.AsyncClient(timeout=15) as client:
-        resp = await client.post(url, headers=self._headers(), json=payload)
+        client = self._http()
+        resp = await client.post(url, headers=self._headers(), json=payload, timeout=SHOPIFY_CANCEL_TIMEOUT_SEC)
+        # Whatever the outcome, the cached snapshot may no longer be current
+        invalidate_order_snapshot(self.shop_domain, order_id)
+        mark_order_stale(self.shop_domain, order_id)
         
         if resp.status_code == 422:
             # Order not cancellable (already shipped, etc.)
@@ -262,6 +349,8 @@ async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dic
         # For now: log intent and return success with placeholder reference
         import secrets
         reference = f"RET-{secrets.token_hex(4).upper()}"
+        invalidate_order_snapshot(self.shop_domain, order_id)
+        mark_order_stale(self.shop_domain, order_id)
         
         return {
             "success": True,
@@ -272,13 +361,47 @@ async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dic
             "reference": reference,
             "refund_eta": "5-7 business days after we receive your items",
         }
+
+    async def prefetch_orders(self, order_ids: List[str]) -> int:
+        """
+        Warm the snapshot cache for several orders at once (bounded
+        concurrency), held for ORDER_PREFETCH_TTL_SEC so the follow-up turn hits it.
+        Mirrored orders need no fetch. Failures are skipped — this is only a
+        cache warm-up. Returns how many orders are now ready.
+        """
+        semaphore = asyncio.Semaphore(ORDER_PREFETCH_CONCURRENCY)
+
+        async def _one(order_id: str):
+            if get_mirrored_order(self.shop_domain, order_id) is not None:
+                return True
+            async with semaphore:
+                return await self._fetch_order(order_id, ttl_seconds=ORDER_PREFETCH_TTL_SEC)
+
+        results = await asyncio.gather(*(_one(oid) for oid in order_ids), return_exceptions=True)
+        return sum(1 for r in results if r and not isinstance(r, Exception))
+
     async def list_orders_by_customer(self, customer_id: str, limit: int = 10) -> List[OrderListItem]:
+        orders, _ = await self.list_orders_page(customer_id, limit)
+        return orders
+
+    async def list_orders_page(self, customer_id: str, limit: int = 10,
+                               cursor: Optional[str] = None) -> Tuple[List[OrderListItem], Optional[str]]:
+        """
+        One page of a customer's orders plus the cursor for the next page
+        (Shopify's page_info from the Link header), or None on the last page.
+        """
         url = f"{self.base_url}/customers/{customer_id}/orders.json"
-        params = {"limit": limit, "status": "any"}
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers=self._headers(), params=params)
-            resp.raise_for_status()
-            orders = resp.json().get("orders", [])
+        # Shopify rejects filters alongside page_info — the cursor carries them
+        params = {"limit": limit, "page_info": cursor} if cursor else {"limit": limit, "status": "any"}
+        client = self._http()
+        resp = await client.get(url, headers=self._headers(), params=params)
+        resp.raise_for_status()
+        orders = resp.json().get("orders", [])
+
+        next_cursor = None
+        next_link = resp.links.get("next")
+        if next_link:
+            next_cursor = httpx.URL(next_link["url"]).params.get("page_info")
 
         return [
             OrderListItem(
@@ -290,7 +413,7 @@ async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dic
                 currency=o.get("currency"),
             )
             for o in orders
-        ]
+        ], next_cursor
 
     async def verify_customer(self, customer_token: Optional[str], customer_id: Optional[str]) -> Optional[str]:
         """
@@ -304,11 +427,112 @@ async def cancel_order(self, order_id: str, reason: Optional[str] = None) -> dic
         if not customer_id:
             return None
         url = f"{self.base_url}/customers/{customer_id}.json"
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers=self._headers())
-            if resp.status_code == 404:
-                return None
-            resp.raise_for_status()
-            customer = resp.json().get("customer")
-
-        return str(customer["id"]) if customer else None
\ No newline at end of file
+        client = self._http()
+        resp = await client.get(url, headers=self._headers())
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        customer = resp.json().get("customer")
+
+        return str(customer["id"]) if customer else None
+
+
+class ShopifyAdapterRegistry:
+    """
+    One ShopifyOrderAdapter (and so one connection pool) per shop, built
+    lazily. A changed access token replaces the shop's adapter; the old
+    client is closed in the background once in-flight requests have had
+    ADAPTER_CLOSE_GRACE_SEC to finish. Call close_all() on shutdown.
+    """
+
+    def __init__(self):
+        self._adapters: Dict[str, ShopifyOrderAdapter] = {}
+        # Pending delayed closes — held so the tasks aren't garbage-collected
+        self._retiring: Dict[asyncio.Task, ShopifyOrderAdapter] = {}
+
+    def get(self, shop_domain: str, access_token: str) -> ShopifyOrderAdapter:
+        adapter = self._adapters.get(shop_domain)
+        if adapter is not None and adapter.access_token == access_token:
+            return adapter
+        if adapter is not None:
+            self._close_later(adapter)
+        adapter = ShopifyOrderAdapter(shop_domain=shop_domain, access_token=access_token)
+        self._adapters[shop_domain] = adapter
+        return adapter
+
+    def _close_later(self, adapter: ShopifyOrderAdapter):
+        try:
+            task = asyncio.get_running_loop().create_task(self._close_after_grace(adapter))
+        except RuntimeError:
+            # No loop — nothing in flight on this client, drop it
+            return
+        self._retiring[task] = adapter
+        task.add_done_callback(lambda t: self._retiring.pop(t, None))
+
+    @staticmethod
+    async def _close_after_grace(adapter: ShopifyOrderAdapter):
+        await asyncio.sleep(ADAPTER_CLOSE_GRACE_SEC)
+        await adapter.aclose()
+
+    async def close_all(self):
+        adapters = list(self._adapters.values())
+        self._adapters.clear()
+        # Shutting down — don't wait out the grace period on replaced adapters
+        for task, adapter in list(self._retiring.items()):
+            task.cancel()
+            adapters.append(adapter)
+        self._retiring.clear()
+        for adapter in adapters:
+            await adapter.aclose()
+
+
+shopify_adapters = ShopifyAdapterRegistry()
+
+
+def adapter_for_config(config: dict) -> ShopifyOrderAdapter:
+    """
+    Pooled platform adapter for a merchant config (from verify_api_key).
+    Swap in WooCommerce/custom-connector adapters here based on config['platform'].
+    """
+    if config.get("platform") != "shopify":
+        raise HTTPException(status_code=501, detail="Platform not yet supported for order lookup")
+    return shopify_adapters.get(config["shop_domain"], config["shopify_access_token"])
+
+
+ORDER_WEBHOOK_TOPICS = ("orders/create", "orders/updated", "orders/paid", "orders/cancelled",
+                        "orders/fulfilled", "orders/partially_fulfilled", "orders/edited")
+
+
+def apply_order_webhook(shop_domain: str, topic: str, payload: dict) -> bool:
+    """
+    Fold one Shopify orders/* or fulfillments/* webhook into the order
+    mirror and drop the shop's cached snapshot. Returns False for topics
+    we don't handle and for payloads without an order id (acknowledged, but
+    ignored — a retry would carry the same body).
+    """
+    if topic in ORDER_WEBHOOK_TOPICS or topic == "orders/delete":
+        order_id = payload.get("id")
+    elif topic.startswith("fulfillments/"):
+        order_id = payload.get("order_id")
+    else:
+        return False
+    if not order_id:
+        print(f"⚠️ order webhook {topic} from {shop_domain} has no order id — ignored")
+        return False
+
+    if topic == "orders/delete":
+        delete_mirrored_order(shop_domain, order_id)
+    elif topic.startswith("fulfillments/"):
+        # Fulfillment payloads don't carry the order's status fields — go
+        # live on the next read rather than patch tracking in place
+        mark_order_stale(shop_domain, order_id)
+    else:
+        context = _normalize_order(payload)
+        if context.order_number:
+            mirror_order(shop_domain, context, *_mirror_identity(payload))
+        else:
+            # No number to match guests on (and the unique index would
+            # collide on "") — reads for this order go live
+            print(f"⚠️ order webhook {topic}: order {order_id} on {shop_domain} has no name — not mirrored")
+    invalidate_order_snapshot(shop_domain, order_id)
+    return True
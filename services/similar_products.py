@@ -0,0 +1,171 @@
+# services/similar_products.py
+"""
+Offline "similar products" job.
+
+Within each category, products are one-hot encoded on brand and every
+attributes.<Name>=<value> pair; similarity is the cosine of those vectors
+blended with price closeness (on a log scale). The top-k for every
+product — plus a separate top-k among strictly cheaper products — is
+stored in product_similarities with card fields inlined, so the request
+path is a single _id read.
+
+Run after catalog syncs, e.g.:
+    python -m services.catalog_maintenance compute-similar-products
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import ReplaceOne
+
+from models.schemas import ShopifyProduct, bump_catalog_version, product_similarities
+
+SIMILAR_TOP_K = 12
+ATTRIBUTE_WEIGHT = 0.7
+PRICE_WEIGHT = 0.3
+# Rows of the similarity matrix computed at a time — bounds memory to
+# BLOCK_ROWS x category size floats
+BLOCK_ROWS = 1024
+WRITE_BATCH_SIZE = 1000
+
+JOB_PROJECTION = {
+    "category_id": 1,
+    "brand": 1,
+    "attributes": 1,
+    "min_price": 1,
+    "title": 1,
+    "image_url": 1,
+    "display_price": 1,
+    "url_handle": 1,
+}
+
+
+def _features(doc: dict) -> List[str]:
+    features = []
+    if doc.get("brand"):
+        features.append(f"brand={str(doc['brand']).strip().lower()}")
+    for name, value in (doc.get("attributes") or {}).items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            if v not in (None, ""):
+                features.append(f"{name}={str(v).strip().lower()}")
+    return features
+
+
+def _card(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title") or "Untitled",
+        "image": doc.get("image_url") or "",
+        "price": doc.get("display_price") or "$0 USD",
+        "min_price": doc.get("min_price"),
+        "handle": doc.get("url_handle") or "",
+        "brand": doc.get("brand") or "",
+    }
+
+
+def _top_k(scores: np.ndarray, k: int) -> List[List[tuple]]:
+    """Per row, [(column, score)] of the k best finite scores, best first."""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    rows = []
+    for offset, candidates in enumerate(top):
+        row_scores = scores[offset, candidates]
+        order = np.argsort(-row_scores, kind="stable")
+        rows.append([
+            (int(candidates[j]), float(row_scores[j])) for j in order if np.isfinite(row_scores[j])
+        ])
+    return rows
+
+
+def _group_similarities(docs: List[dict], k: int) -> Dict[int, tuple]:
+    """row → ([(neighbour row, score)], [(cheaper neighbour row, score)]) for one category."""
+    n = len(docs)
+    if n < 2:
+        return {}
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, doc in enumerate(docs):
+        for feature in _features(doc):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+    matrix = np.zeros((n, max(len(vocabulary), 1)), dtype=np.float32)
+    if rows:
+        matrix[rows, cols] = 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+
+    prices = np.array(
+        [math.log1p(doc["min_price"]) if doc.get("min_price") else np.nan for doc in docs],
+        dtype=np.float32,
+    )
+    k = min(k, n - 1)
+    result = {}
+    for start in range(0, n, BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, n)
+        cosine = matrix[start:end] @ matrix.T
+        price_sim = np.exp(-np.abs(prices[start:end, None] - prices[None, :]))
+        # Unknown prices neither help nor hurt
+        price_sim = np.nan_to_num(price_sim, nan=0.0)
+        scores = ATTRIBUTE_WEIGHT * cosine + PRICE_WEIGHT * price_sim
+        scores[np.arange(end - start), np.arange(start, end)] = -np.inf
+        # Ranked separately so "cheaper" isn't limited to whatever cheaper
+        # products happen to make the overall top-k (unknown prices never qualify)
+        cheaper_scores = np.where(prices[None, :] < prices[start:end, None], scores, -np.inf)
+        for offset, (similar, cheaper) in enumerate(zip(_top_k(scores, k), _top_k(cheaper_scores, k))):
+            result[start + offset] = (similar, cheaper)
+    return result
+
+
+def compute_similar_products(k: int = SIMILAR_TOP_K) -> dict:
+    """
+    Recompute top-k similar products for the whole catalog and replace the
+    stored lists. Products removed since the last run lose their entry.
+    """
+    started = datetime.utcnow()
+    groups: Dict[object, List[dict]] = defaultdict(list)
+    for doc in ShopifyProduct._get_collection().find({}, JOB_PROJECTION):
+        groups[doc.get("category_id")].append(doc)
+
+    collection = product_similarities._get_collection()
+    ops = []
+    written = 0
+    for docs in groups.values():
+        for row, (neighbours, cheaper) in _group_similarities(docs, k).items():
+            ops.append(ReplaceOne({"_id": docs[row]["_id"]}, {
+                "min_price": docs[row].get("min_price"),
+                "similar": [{**_card(docs[neighbour]), "score": round(score, 4)}
+                            for neighbour, score in neighbours],
+                "similar_cheaper": [{**_card(docs[neighbour]), "score": round(score, 4)}
+                                    for neighbour, score in cheaper],
+                "computed_at": started,
+            }, upsert=True))
+            if len(ops) >= WRITE_BATCH_SIZE:
+                collection.bulk_write(ops, ordered=False)
+                written += len(ops)
+                ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+        written += len(ops)
+    removed = collection.delete_many({"computed_at": {"$lt": started}}).deleted_count
+    # /products/{id}/similar ETags hang off the catalog version
+    bump_catalog_version()
+    print(f"✅ Similar products: {written} products scored across {len(groups)} categories, "
+          f"{removed} stale entries removed")
+    return {"products": written, "categories": len(groups), "removed": removed}
+
+
+def get_similar_products(product_id: int, limit: Optional[int] = None,
+                         cheaper: bool = False) -> Optional[List[dict]]:
+    """
+    Stored similar-product cards, best first; None when the product has not
+    been scored. cheaper=True returns the separate ranking of products
+    priced below this one.
+    """
+    field = "similar_cheaper" if cheaper else "similar"
+    doc = product_similarities._get_collection().find_one({"_id": product_id}, {field: 1})
+    if doc is None:
+        return None
+    similar = doc.get(field) or []
+    return similar[:limit] if limit else similar